@@ -1,60 +1,86 @@
 import os
 
-from flask import Flask, redirect, render_template, session, flash, request
+from flask import Flask, Blueprint, current_app, redirect, render_template, session, flash, request, jsonify
+import click
 import requests
-import json
-from flask_debugtoolbar import DebugToolbarExtension
-from models import db, connect_db, User, Exercise, ExerciseCategory, ExerciseComment, MealCategory, MealComment, UserExercise, UserMeal
+from sqlalchemy.exc import IntegrityError
+from models import db, connect_db, User, Exercise, ExerciseComment, MealCategory, MealComment, UserExercise, UserMeal, ExerciseCounter, MealCounter
 from forms import RegistrationForm, LoginForm, CommentForm, UserEditForm, ChangePasswordForm
-import pdb
+from config import configs
+from auth import login_user, logout_user, require_user, require_user_id, is_missing_user
+from comments import get_comment_page
+import counters
+import leaderboards
+from leaderboards import leaderboard_cache
+from catalog import get_meal, get_category_meals, start_sync_worker, sync_catalog
+from news import news_feed
+from mealdb import mealdb
+import http_client
+from search_index import meal_index
+from exercise_catalog import exercise_catalog
+from exercise_images import resolve_images
 from werkzeug.exceptions import Unauthorized, NotFound
 
-app = Flask(__name__, template_folder='templates')
+# Routes, error handlers and CLI commands live on this blueprint; create_app() puts them on an app.
+bp = Blueprint('main', __name__, cli_group=None)
 
-# Get DB_URI from environ variable (useful for production/testing) or,
-# if not set there, use development local db.
-app.config['SQLALCHEMY_DATABASE_URI'] = (
-    os.environ.get('DATABASE_URL', 'postgresql:///capstone'))
+def create_app(config='production'):
+    """Create and configure an app for the `config` profile ("development", "testing" or "production").
 
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ECHO'] = False
+    Nothing here talks to the database or the upstream APIs, so creating an app is cheap
+    and safe to do before gunicorn forks its workers (`--preload`). Create or update the
+    schema with `flask db upgrade`.
+    """
 
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', "it's a secret")
-app.config['DEBUG_TB_INTERCEPT_REDIRECTS'] = False
-debug = DebugToolbarExtension(app)
+    app = Flask(__name__, template_folder='templates')
 
-connect_db(app)
-db.create_all()
+    app.config.from_object(configs[config])
 
-@app.before_first_request
-def populate_database():
-    """ Run helper functions to populate database if needed."""    
+    connect_db(app)
 
-    # These helper functions check if APIs return any new meal or exercise data. If so, they take that data and add it to the database.
+    # Dev-only extensions are imported only when they're used.
+    if app.config['DEBUG_TOOLBAR']:
+        from flask_debugtoolbar import DebugToolbarExtension
+        DebugToolbarExtension(app)
 
-    get_exercise_categories()
-    get_meal_categories()
-    get_exercises()
+    app.register_blueprint(bp)
 
-@app.route('/')
+    return app
+
+@bp.before_app_first_request
+def start_background_sync():
+    """Start the periodic catalog sync for this worker, if enabled.
+
+    The sync itself runs in a background thread, so no request waits on the upstream APIs.
+    Run `flask sync-catalog` to populate the database the first time.
+    """
+
+    interval = current_app.config['CATALOG_SYNC_INTERVAL']
+
+    if interval:
+        start_sync_worker(current_app._get_current_object(), interval)
+
+@bp.route('/')
 def homepage():
+    """Show the homepage with the latest news, served from the background-refreshed feed."""
 
-    health_request = requests.get('https://content.guardianapis.com/search?q=%22healthy%20eating%22&api-key=67145bff-c60a-4155-a395-30810db46f1f')
+    health_result = news_feed.get('health')
 
-    health_result = health_request.json()['response']['results']
+    exercise_result = news_feed.get('exercise')
 
-    exercise_request = requests.get('https://content.guardianapis.com/search?q=%22exercising%22&api-key=67145bff-c60a-4155-a395-30810db46f1f')
+    # Precomputed by `flask refresh-leaderboards` and kept in memory.
+    exercise_boards = leaderboard_cache.get_boards("exercises")
 
-    exercise_result = exercise_request.json()['response']['results']
+    meal_boards = leaderboard_cache.get_boards("meals")
 
-    return render_template("homepage.html", health_result=health_result, exercise_result=exercise_result)
+    return render_template("homepage.html", health_result=health_result, exercise_result=exercise_result, exercise_boards=exercise_boards, meal_boards=meal_boards)
 
 
 ###
 # User Routes
 ###
 
-@app.route("/register", methods=["GET", "POST"])
+@bp.route("/register", methods=["GET", "POST"])
 def register():
     """Show a registeration form and handle form submission."""
 
@@ -79,15 +105,15 @@ def register():
 
         db.session.commit()
 
-        # add username to session
-        session['username'] = user.username
+        # add user to session
+        login_user(user)
 
         flash(f"Welcome {username}!", "success")
         return redirect(f"/users/{user.username}")
     else:
         return render_template("user/register.html", form=form)
 
-@app.route("/login", methods=["GET", "POST"])
+@bp.route("/login", methods=["GET", "POST"])
 def login():
     """Show a login form and handle form submission."""
 
@@ -104,7 +130,7 @@ def login():
         user = User.authenticate(username, password)
 
         if user:
-            session["username"] = user.username
+            login_user(user)
             flash(f"Welcome back {username}!", "success")
             return redirect(f"/users/{user.username}")
         else:
@@ -112,54 +138,43 @@ def login():
     
     return render_template("user/login.html", form=form)
 
-@app.route("/logout")
+@bp.route("/logout")
 def logout():
     """Log user out and redirect to /login."""
 
-    session.pop("username")
+    logout_user()
 
     flash(f"Goodbye!", "info")
 
     return redirect("/")
 
-@app.route("/users/<username>")
+@bp.route("/users/<username>")
 def user_info(username):
     """Show user info and user's feedbacks."""
     
     # Make sure the logged in user is the authorized user to view this page.
-    if "username" not in session or username != session['username']:
-        raise Unauthorized()
+    user_id = require_user_id(username)
     
-    username = session['username']
-
-    user = User.query.filter_by(username=username).first()
-
-    user_exercises = UserExercise.query.filter_by(user_id=user.id).all()
-
-    user_meals = UserMeal.query.filter_by(user_id=user.id).all()
+    # Favorites and comments (with the exercises they point to) are loaded up front,
+    # so rendering the template doesn't issue a query per row.
+    user = User.get_dashboard(user_id)
 
-    user_exercise_comments = ExerciseComment.query.filter_by(user_id=user.id).all()
-
-    user_meal_comments = MealComment.query.filter_by(user_id=user.id).all()
+    if user is None:
+        raise Unauthorized()
 
-    return render_template("user/user.html", user=user, user_exercises=user_exercises, user_meals=user_meals, user_exercise_comments=user_exercise_comments, user_meal_comments=user_meal_comments)
+    return render_template("user/user.html", user=user, user_exercises=user.user_exercises, user_meals=user.user_meals, user_exercise_comments=user.exercise_comments, user_meal_comments=user.meal_comments)
 
-@app.route("/users/<username>/settings", methods=["GET", "POST"])
+@bp.route("/users/<username>/settings", methods=["GET", "POST"])
 def change_user_settings(username):
     """Handle user settings change."""
 
     # Make sure the logged in user is the authorized user to view this page.
-    if "username" not in session or username != session['username']:
-        raise Unauthorized()
-
-    user = User.query.filter_by(username=username).first()
+    user = require_user(username)
 
     form = UserEditForm(obj=user)
 
     if form.validate_on_submit():
-        user_auth = User.authenticate(form.username.data, form.password.data)
-
-        if user_auth:
+        if user.check_password(form.password.data):
             user.username = form.username.data
             user.email = form.email.data
             user.first_name = form.first_name.data
@@ -168,6 +183,9 @@ def change_user_settings(username):
 
             db.session.commit()
 
+            # Keep the session's username in step for links and URL checks.
+            login_user(user)
+
             flash("Update Successful.", "success")
             return redirect(f'/users/{user.username}')
 
@@ -177,16 +195,11 @@ def change_user_settings(username):
 
     return render_template('/user/settings.html', form=form)
 
-@app.route('/users/<username>/change-password', methods=["GET", "POST"])
+@bp.route('/users/<username>/change-password', methods=["GET", "POST"])
 def change_password(username):
 
     # Make sure the logged in user is the authorized user to view this page.
-    if "username" not in session or username != session['username']:
-        raise Unauthorized()
-
-    user = User.query.filter_by(username=username).first()
-
-    user_id = user.id
+    user_id = require_user_id(username)
 
     form = ChangePasswordForm()
 
@@ -196,7 +209,6 @@ def change_password(username):
 
         # If user's current password is true, update password.   
         if User.change_password(user_id, current_password, new_password):
-            User.change_password(user_id, current_password, new_password)
             flash("Password updated.", "success")
             return redirect('/')
         else:
@@ -205,157 +217,162 @@ def change_password(username):
     else:
         return render_template('/user/change_password.html', form=form)
 
-@app.route("/users/<username>/delete", methods=["POST"])
+@bp.route("/users/<username>/delete", methods=["POST"])
 def delete_user(username):
     """Delete existing user."""
 
     # Make sure the logged in user is the authorized user.
-    if "username" not in session or username != session['username']:
-        raise Unauthorized()
+    user_id = require_user_id(username)
 
-    user = User.query.filter_by(username=username).first()
+    # Take the user's comments and favorites off the counters in the same transaction.
+    counters.release_user(user_id)
 
-    db.session.delete(user)
+    User.remove(user_id)
 
     db.session.commit()
 
-    session.pop("username")
+    logout_user()
 
     flash("Account Deleted", "success")
 
     return redirect("/")
 
-@app.route("/users/<username>/meals/add", methods=["POST"])
+@bp.route("/users/<username>/meals/add", methods=["POST"])
 def favorite_meal(username):
     """Handle favoriting a meal."""
 
     # Make sure the logged in user is the authorized user.
-    if "username" not in session or username != session['username']:
-        raise Unauthorized()
+    user_id = require_user_id(username)
     
-    user = User.query.filter_by(username=username).first()
-
     # Get meal_id from the form submission
-    meal_id = request.form['data']
-
-    # Make an API request for that meal
-    meal_request = requests.get(f'https://www.themealdb.com/api/json/v1/1/lookup.php?i={meal_id}')
-
-    meal = meal_request.json()['meals'][0]
+    meal_id = request.form.get('data', type=int)
 
-    # Get meal information from API response
-    meal_name = meal['strMeal']
-    meal_category_name = str(meal['strCategory'])
-
-    # Get the category information of the meal from the database
-    meal_category = MealCategory.query.filter_by(name=meal_category_name).first()
+    if meal_id is None:
+        raise NotFound()
 
-    meal_category_id = meal_category.id
+    meal = get_meal(meal_id)
 
-    # Create a new UserMeal instance
-    user_meal = UserMeal(user_id=user.id, meal_id=meal_id, meal_name=meal_name, meal_category=meal_category_id)
+    if not meal:
+        raise NotFound()
 
-    db.session.add(user_meal)
+    # Adding a meal that's already a favorite (e.g. a double submit) is a no-op.
+    if UserMeal.add(user_id, meal):
+        counters.bump(MealCounter, meal.id, favorites=1)
 
     db.session.commit()
 
     return redirect(request.referrer)
 
-@app.route("/users/<username>/meals/remove", methods=["POST"])
+@bp.route("/users/<username>/meals/remove", methods=["POST"])
 def unfavorite_meal(username):
     """Handle unfavoriting a meal."""
     
     # Make sure the logged in user is the authorized user.
-    if "username" not in session or username != session['username']:
-        raise Unauthorized()
+    user_id = require_user_id(username)
     
     # Get meal_id from the form submission
-    meal_id = request.form['data']
+    meal_id = request.form.get('data', type=int)
 
-    user = User.query.filter_by(username=username).first()
+    if meal_id is None:
+        raise NotFound()
     
-    # Find user's meal to remove from the database
-    user_meal = UserMeal.query.filter_by(user_id=user.id, meal_id=meal_id).first()
+    # Remove the favorite in one statement; removing one that's already gone is a no-op.
+    removed = UserMeal.remove(user_id, meal_id)
 
-    db.session.delete(user_meal)
+    if removed:
+        counters.bump(MealCounter, meal_id, favorites=-1, added_on=removed.added_on)
 
     db.session.commit()
 
     return redirect(request.referrer)
 
-@app.route("/users/<username>/exercises/add", methods=["POST"])
+@bp.route("/users/<username>/exercises/add", methods=["POST"])
 def favorite_exercise(username):
     """Handle favoriting an exercise."""
     
     # Make sure the logged in user is the authorized user.
-    if "username" not in session or username != session['username']:
-        raise Unauthorized()
-    
-    user = User.query.filter_by(username=username).first()
+    user_id = require_user_id(username)
 
     # Get the exercise id from the form.
-    exercise_id = request.form['data']
-    
-    # Create a UserExercise instance
-    user_exercise = UserExercise(user_id=user.id, exercise_id=exercise_id)
+    exercise_id = request.form.get('data', type=int)
 
-    db.session.add(user_exercise)
+    if exercise_id is None:
+        raise NotFound()
 
-    db.session.commit()
+    # Adding an exercise that's already a favorite (e.g. a double submit) is a no-op.
+    try:
+        if UserExercise.add(user_id, exercise_id):
+            counters.bump(ExerciseCounter, exercise_id, favorites=1)
+
+        db.session.commit()
+    except IntegrityError as e:
+        # A deleted user is handled by missing_user() like any other write.
+        if is_missing_user(e):
+            raise
+
+        # No such exercise.
+        db.session.rollback()
+        raise NotFound()
 
     return redirect(request.referrer)
 
-@app.route("/users/<username>/exercises/remove", methods=["POST"])
+@bp.route("/users/<username>/exercises/remove", methods=["POST"])
 def unfavorite_exercise(username):
     """Handle unfavoriting an exercise."""
     
     # Make sure the logged in user is the authorized user.
-    if "username" not in session or username != session['username']:
-        raise Unauthorized()
+    user_id = require_user_id(username)
     
     # Get the exercise id from the form
-    exercise_id = request.form['data']
+    exercise_id = request.form.get('data', type=int)
 
-    user = User.query.filter_by(username=username).first()
+    if exercise_id is None:
+        raise NotFound()
     
-    # Find user's exercise to remove from the database
-    user_exercise = UserExercise.query.filter_by(user_id=user.id, exercise_id=exercise_id).first()
+    # Remove the favorite in one statement; removing one that's already gone is a no-op.
+    removed = UserExercise.remove(user_id, exercise_id)
 
-    db.session.delete(user_exercise)
+    if removed:
+        counters.bump(ExerciseCounter, exercise_id, favorites=-1, added_on=removed.added_on)
 
     db.session.commit()
 
     return redirect(request.referrer)
 
-@app.route('/exercise-comments/<int:comment_id>/delete', methods=["POST"])
+@bp.route('/exercise-comments/<int:comment_id>/delete', methods=["POST"])
 def delete_exercise_comment(comment_id):
     """Delete an exercise comment."""
 
     # Find user's exercise comment to delete from the database
     comment = ExerciseComment.query.get_or_404(comment_id)
 
-    # Make sure the logged in user is the authorized user.
-    if "username" not in session or comment.user.username != session['username']:
+    # Make sure the logged in user is the comment's author.
+    if comment.user_id != require_user_id():
         raise Unauthorized()
 
     db.session.delete(comment)
 
+    counters.bump(ExerciseCounter, comment.exercise_id, comments=-1, added_on=comment.added_on)
+
     db.session.commit()
 
     return redirect(request.referrer)
 
-@app.route('/meal-comments/<int:comment_id>/delete', methods=["POST"])
+@bp.route('/meal-comments/<int:comment_id>/delete', methods=["POST"])
 def delete_meal_comment(comment_id):
     """Delete a meal comment."""
 
     # Find user's meal comment to delete from the database
     comment = MealComment.query.get_or_404(comment_id)
 
-    # Make sure the logged in user is the authorized user.
-    if "username" not in session or comment.user.username != session['username']:
+    # Make sure the logged in user is the comment's author.
+    if comment.user_id != require_user_id():
         raise Unauthorized()
 
     db.session.delete(comment)
+
+    counters.bump(MealCounter, comment.meal_id, comments=-1, added_on=comment.added_on)
+
     db.session.commit()
 
     return redirect(request.referrer)
@@ -364,70 +381,95 @@ def delete_meal_comment(comment_id):
 # Exercise Routes
 ###
 
-@app.route('/exercises')
+@bp.route('/exercises')
 def display_workout_categories():
     """Display exercise categories."""
 
-    categories = ExerciseCategory.query.all()
-    
-    return render_template("/exercise/exercise_categories.html", categories=categories)
+    # Served from memory; the list is rebuilt only after the catalog sync writes.
+    categories = exercise_catalog.categories()
+
+    boards = leaderboard_cache.get_boards("exercises")
 
-@app.route('/exercises/<int:category_id>/')
+    return render_template("/exercise/exercise_categories.html", categories=categories, boards=boards)
+
+@bp.route('/exercises/<int:category_id>/')
 def display_exercises(category_id):
     """Display exercises for a specific category."""
 
-    exercises = Exercise.query.filter(Exercise.category_id==category_id)
+    # Served from memory; the list is rebuilt only after the catalog sync writes.
+    listing = exercise_catalog.category(category_id)
+
+    # Make sure category exists and has exercises, otherwise return 404 error.
+    if listing and listing["exercises"]:
+        boards = leaderboard_cache.get_boards("exercises", category_id)
 
-    # Make sure category exists, otherwise return 404 error.
-    if exercises.count() > 0:
-        return render_template("/exercise/category.html", exercises=exercises)
+        return render_template("/exercise/category.html", category=listing["category"], exercises=listing["exercises"], boards=boards)
     else:
         raise NotFound()
 
-@app.route('/exercises/<int:category_id>/<int:exercise_id>')
+@bp.route('/exercises/<int:category_id>/<int:exercise_id>')
 def display_exercise(category_id, exercise_id):
     """Display info on a single exercise."""
 
     # This is a private endpoint, check if user is logged in
-    if "username" not in session:
-        raise Unauthorized()
+    user_id = require_user_id()
 
     exercise = Exercise.query.get_or_404(exercise_id)
 
-    comments = ExerciseComment.query.filter_by(exercise_id=exercise_id)
-
-    comment_count = comments.count()
+    # Newest comments first, with their authors; older ones are loaded from /comments as the user asks.
+    comments, next_before = get_comment_page(ExerciseComment, current_app.config['COMMENTS_PER_PAGE'], exercise_id=exercise_id)
 
-    user = User.query.filter_by(username=session['username']).first()
+    counts = counters.get_counts(ExerciseCounter, exercise_id)
 
-    user_exercise = UserExercise.query.filter_by(user_id=user.id, exercise_id=exercise_id).first()
+    user_exercise = UserExercise.query.filter_by(user_id=user_id, exercise_id=exercise_id).first()
 
     form = CommentForm()
     
-    return render_template("exercise/exercise.html", exercise=exercise, comments=comments, form=form, user=user, user_exercise=user_exercise, comment_count=comment_count)
+    return render_template("exercise/exercise.html", exercise=exercise, comments=comments, form=form, user_exercise=user_exercise, counts=counts, comment_count=counts.comment_count, next_before=next_before)
+
+@bp.route('/exercises/<int:category_id>/<int:exercise_id>/comments')
+def list_exercise_comments(category_id, exercise_id):
+    """Return the exercise's comments older than `before` as rendered HTML in JSON."""
+
+    # This is a private endpoint, check if user is logged in
+    require_user_id()
+
+    before = request.args.get('before', type=int)
+
+    comments, next_before = get_comment_page(ExerciseComment, current_app.config['COMMENTS_PER_PAGE'], before, exercise_id=exercise_id)
+
+    html = render_template("exercise/exercise_comment_items.html", comments=comments)
+
+    return jsonify(html=html, next_before=next_before)
 
-@app.route('/exercises/<int:category_id>/<int:exercise_id>/comment', methods=["POST"])
+@bp.route('/exercises/<int:category_id>/<int:exercise_id>/comment', methods=["POST"])
 def add_exercise_comment(category_id, exercise_id):
     """Handle comment for an exercise."""
     
     # This is a private endpoint, check if user is logged in
-    if "username" not in session:
-        raise Unauthorized()
+    user_id = require_user_id()
 
     form = CommentForm()
 
-    username = session['username']
-
     if form.validate_on_submit():
-        user = User.query.filter_by(username=username).first()
-
         content = form.content.data
         
-        exercise_comment = ExerciseComment(exercise_id=exercise_id, user_id=user.id, content = content)
+        exercise_comment = ExerciseComment(exercise_id=exercise_id, user_id=user_id, content = content)
 
         db.session.add(exercise_comment)
 
-        db.session.commit()
+        try:
+            counters.bump(ExerciseCounter, exercise_id, comments=1)
+
+            db.session.commit()
+        except IntegrityError as e:
+            # A deleted user is handled by missing_user() like any other write.
+            if is_missing_user(e):
+                raise
+
+            # No such exercise.
+            db.session.rollback()
+            raise NotFound()
 
     return redirect(f"/exercises/{category_id}/{exercise_id}")
 
@@ -435,13 +477,15 @@ def add_exercise_comment(category_id, exercise_id):
 # Meal Routes
 ###
 
-@app.route('/meals')
+@bp.route('/meals')
 def meals_top_page():
     """Display options to view meals."""
 
-    return render_template("meal/meals_index.html")
+    boards = leaderboard_cache.get_boards("meals")
+
+    return render_template("meal/meals_index.html", boards=boards)
 
-@app.route('/meals/meal-categories')
+@bp.route('/meals/meal-categories')
 def display_meal_categories():
     """Display meal categories."""
 
@@ -449,176 +493,255 @@ def display_meal_categories():
 
     return render_template("meal/meal_categories.html", meal_categories=meal_categories)
 
-@app.route('/meals/search')
+@bp.route('/meals/search')
 def meal_search():
-    """Show a search form for users to directly search for meals and display search results."""
+    """Show a search form for users to directly search for meals and display search results.
+
+    With a `q` parameter, return the matching meals from our local search index as JSON.
+    """
+
+    query = request.args.get('q')
+
+    if query is not None:
+        return jsonify(meals=meal_index.search(query))
 
     return render_template("meal/meal_search.html")
 
-@app.route('/meals/<int:category_id>')
+@bp.route('/meals/random')
+def random_meal():
+    """Redirect to the page of a random meal from our local copy of the catalog."""
+
+    meal = meal_index.random_meal()
+
+    if meal is None:
+        raise NotFound()
+
+    return redirect(f"/meals/{meal['category_id']}/{meal['id']}")
+
+@bp.route('/meals/<int:category_id>')
 def display_meal_by_categories(category_id):
     """Display meals for a specific category."""
 
     meal_category = MealCategory.query.get_or_404(category_id)
 
-    return render_template("meal/meal_by_categories.html", meal_category=meal_category)
+    per_page = current_app.config['MEALS_PER_PAGE']
+
+    # Render the first page here, the rest is loaded from /meals/<category_id>/list as the user asks for it.
+    try:
+        meals, total = get_category_meals(meal_category, 1, per_page)
+    except requests.RequestException:
+        # Category isn't synced yet and TheMealDB is down: show the page without meals.
+        meals, total = [], 0
+        flash("Meals for this category are temporarily unavailable. Please try again later.", "warning")
+
+    has_next = total > per_page
+
+    boards = leaderboard_cache.get_boards("meals", category_id)
+
+    return render_template("meal/meal_by_categories.html", meal_category=meal_category, meals=meals, has_next=has_next, boards=boards)
+
+@bp.route('/meals/<int:category_id>/list')
+def list_meals_by_category(category_id):
+    """Return a page of meals for a specific category as JSON."""
 
-@app.route('/meals/<int:category_id>/<int:meal_id>')
+    meal_category = MealCategory.query.get_or_404(category_id)
+
+    page = max(request.args.get('page', 1, type=int), 1)
+
+    per_page = current_app.config['MEALS_PER_PAGE']
+
+    try:
+        meals, total = get_category_meals(meal_category, page, per_page)
+    except requests.RequestException:
+        return jsonify(error="Meals for this category are temporarily unavailable."), 503
+
+    return jsonify(meals=meals, page=page, total=total, has_next=page * per_page < total)
+
+@bp.route('/meals/<int:category_id>/<int:meal_id>')
 def display_meal(category_id, meal_id):
 
     # This is a private endpoint, check if user is logged in
-    if "username" not in session:
-        raise Unauthorized()
+    user_id = require_user_id()
 
-    request = requests.get(f'https://www.themealdb.com/api/json/v1/1/lookup.php?i={meal_id}')
+    meal = get_meal(meal_id)
     
     # Check if meal exists
-    if request.json()['meals']:
-
-        user = User.query.filter_by(username=session['username']).first()
+    if meal:
 
-        meal = request.json()['meals'][0]
-        
         cat_id = category_id
         m_id = meal_id
 
         form = CommentForm()
 
-        comments = MealComment.query.filter_by(meal_id=meal_id)
+        # Newest comments first, with their authors; older ones are loaded from /comments as the user asks.
+        comments, next_before = get_comment_page(MealComment, current_app.config['COMMENTS_PER_PAGE'], meal_id=meal_id)
 
-        comment_count = comments.count()
+        counts = counters.get_counts(MealCounter, meal_id)
 
-        user_meal = UserMeal.query.filter_by(user_id=user.id, meal_id=meal_id).first()
+        user_meal = UserMeal.query.filter_by(user_id=user_id, meal_id=meal_id).first()
 
-        return render_template("meal/meal.html", meal=meal, form=form, cat_id=cat_id, m_id=m_id, comments=comments, comment_count=comment_count, user_meal=user_meal)
+        return render_template("meal/meal.html", meal=meal, form=form, cat_id=cat_id, m_id=m_id, comments=comments, counts=counts, comment_count=counts.comment_count, next_before=next_before, user_meal=user_meal)
     
     # If meal doesn't exist, return 404
     else:
         raise NotFound()
 
-@app.route('/meals/<int:category_id>/<int:meal_id>/comment', methods=["POST"])
+@bp.route('/meals/<int:category_id>/<int:meal_id>/comment', methods=["POST"])
 def add_meal_comment(category_id, meal_id):
     """Handle comment for a meal."""
 
     #This is a private endpoint, check if user is logged in
-    if "username" not in session:
-        raise Unauthorized()
+    user_id = require_user_id()
     
     form = CommentForm()
 
-    username = session['username']
-
     if form.validate_on_submit():
+        content = form.content.data
+
+        meal = get_meal(meal_id)
+
+        if not meal:
+            raise NotFound()
         
-        user = User.query.filter_by(username=username).first()
+        meal_comment = MealComment(meal_id=meal.id, user_id=user_id, content = content, meal_name=meal.name, meal_category=meal.category_id)
 
-        content = form.content.data
+        db.session.add(meal_comment)
 
-        meal_request = requests.get(f'https://www.themealdb.com/api/json/v1/1/lookup.php?i={meal_id}')
+        counters.bump(MealCounter, meal.id, comments=1)
 
-        meal = meal_request.json()['meals'][0]
+        db.session.commit()
 
-        meal_name = meal['strMeal']
+    return redirect(f"/meals/{category_id}/{meal_id}")
 
-        meal_category_name = str(meal['strCategory'])
+@bp.route('/meals/<int:category_id>/<int:meal_id>/comments')
+def list_meal_comments(category_id, meal_id):
+    """Return the meal's comments older than `before` as rendered HTML in JSON."""
 
-        meal_category = MealCategory.query.filter_by(name=meal_category_name).first()
+    # This is a private endpoint, check if user is logged in
+    require_user_id()
 
-        meal_category_id = meal_category.id
-        
-        meal_comment = MealComment(meal_id=meal_id, user_id=user.id, content = content, meal_name=meal_name, meal_category=meal_category_id)
+    before = request.args.get('before', type=int)
 
-        db.session.add(meal_comment)
+    comments, next_before = get_comment_page(MealComment, current_app.config['COMMENTS_PER_PAGE'], before, meal_id=meal_id)
 
-        db.session.commit()
+    html = render_template("meal/meal_comment_items.html", comments=comments, m_id=meal_id)
 
-    return redirect(f"/meals/{category_id}/{meal_id}")
+    return jsonify(html=html, next_before=next_before)
 
 ###
-# Error Handlers
+# Status Routes
 ###
 
-@app.errorhandler(404)
-def page_not_found(e):
-    return render_template("404.html"), 404
+@bp.route('/status/upstreams')
+def upstream_status():
+    """Show circuit breaker, cache and news feed state for the upstream APIs, and database pool usage, as JSON."""
 
-@app.errorhandler(401)
-def not_authorized(e):
-    return render_template("401.html"), 401
+    token = current_app.config['STATUS_TOKEN']
+
+    if token and request.headers.get('X-Status-Token') != token:
+        raise Unauthorized()
+
+    return jsonify(
+        upstreams=http_client.stats(),
+        mealdb_cache=mealdb.stats(),
+        news=dict(last_refresh=news_feed.last_refresh, last_error=news_feed.last_error),
+        database=db.pool_stats(),
+    )
 
 ###
-# Helper functions to check if APIs have any new meal or exercise results. 
+# CLI Commands
 ###
 
-def get_exercise_categories():
-    """Get muscle groups from API and place them in db."""
-    request = requests.get('https://wger.de/api/v2/exercisecategory/')
-
-    result = request.json()
+@bp.cli.command("sync-catalog")
+@click.option("--full", is_flag=True, help="Re-fetch and re-process everything, ignoring what the last sync saw.")
+def sync_catalog_command(full):
+    """Copy new and changed exercises, meals and their categories from the upstream APIs."""
 
-    # Find all exercise categories currently stored in database
-    exercise_categories = ExerciseCategory.query.all()
+    def report(seen, total):
+        click.echo(f"Processed {seen}/{total or '?'} exercises.")
 
-    category_ids = []
+    counts = sync_catalog(progress=report, force=full)
 
-    # Push current exercise category ids into a list
-    for category in exercise_categories:
-        category_ids.append(category.id)    
+    for table, count in counts.items():
+        click.echo(f"{table}: {count} rows inserted or updated.")
 
-    # If there is a new category in API result that doesn't exist in database, store it in database.
-    for item in result['results']:
-        if item['id'] not in category_ids:
-            exercise_category = ExerciseCategory(id=item['id'], name=item['name'])
+@bp.cli.command("resolve-exercise-images")
+def resolve_exercise_images_command():
+    """Find images for exercises that don't have one yet or whose image is stale."""
 
-            db.session.add(exercise_category)
-    
-            db.session.commit()
+    count = resolve_images()
 
-def get_exercises():
-    """Get exercises from API and place them in db."""
-    request = requests.get('https://wger.de/api/v2/exercise?language=2&limit=250')
+    if count is None:
+        click.echo("RAPIDAPI_KEY isn't set, skipping.")
+        return
 
-    result = request.json()
+    click.echo(f"Resolved images for {count} exercises.")
 
-    # Find all exercises currently stored in database
-    exercises = Exercise.query.all()
+@bp.cli.command("backfill-descriptions")
+def backfill_descriptions_command():
+    """Build sanitized descriptions for exercises stored before they were added."""
 
-    exercise_ids = []
+    exercises = Exercise.query.filter(Exercise.description_html == None).all()
 
     for exercise in exercises:
-        exercise_ids.append(exercise.id)
+        exercise.set_description(exercise.description)
 
+    db.session.commit()
 
-    for item in result['results']:
-        if item['id'] not in exercise_ids:
-            exercise = Exercise(id=item['id'], name=item['name'], description=item['description'], category_id=item['category'])
-        
-            db.session.add(exercise)
+    click.echo(f"Backfilled descriptions for {len(exercises)} exercises.")
 
-            db.session.commit()
+@bp.cli.command("reconcile-counters")
+def reconcile_counters_command():
+    """Recompute the comment and favorite counts of every exercise and meal."""
+
+    for counter in (ExerciseCounter, MealCounter):
+        changed = counters.reconcile(counter)
 
-def get_meal_categories():
-    """Get meal categories from API and place them in db."""
+        click.echo(f"{counter.__tablename__}: {changed} rows corrected.")
 
-    request = requests.get('https://www.themealdb.com/api/json/v1/1/categories.php')
+    db.session.commit()
 
-    result = request.json()
+@bp.cli.command("refresh-leaderboards")
+def refresh_leaderboards_command():
+    """Rebuild the most favorited and most discussed boards from recent activity."""
 
-    # Find all meal categories currently stored in database
-    meal_categories = MealCategory.query.all()
+    written = leaderboards.refresh(current_app.config['LEADERBOARD_DAYS'], current_app.config['LEADERBOARD_SIZE'])
 
-    category_ids = []
+    db.session.commit()
 
-    # Push current exercise category ids into a list
-    for category in meal_categories:
-        category_ids.append(category.id)    
+    click.echo(f"Wrote {written} leaderboard entries.")
 
-    
-    # If there is a new category in API result that doesn't exist in database, store it in database.
-    for item in result['categories']:
-        if int(item['idCategory']) not in category_ids:
-            meal_category = MealCategory(id=item['idCategory'], name=item['strCategory'], description=item['strCategoryDescription'], image_url=item['strCategoryThumb'])
+###
+# Error Handlers
+###
+
+@bp.app_errorhandler(404)
+def page_not_found(e):
+    return render_template("404.html"), 404
+
+@bp.app_errorhandler(401)
+def not_authorized(e):
+    return render_template("401.html"), 401
+
+@bp.app_errorhandler(IntegrityError)
+def missing_user(e):
+    """The session's user has been deleted, so a write on their behalf failed its foreign key."""
+
+    db.session.rollback()
+
+    if not is_missing_user(e):
+        raise e
+
+    logout_user()
+
+    return render_template("401.html"), 401
+
+@bp.app_errorhandler(requests.RequestException)
+def upstream_unavailable(e):
+    """An upstream API we needed for this page is down or timed out."""
+
+    current_app.logger.warning("Upstream unavailable for %s: %s", request.path, e)
 
-            db.session.add(meal_category)
+    return render_template("503.html"), 503
 
-            db.session.commit()
\ No newline at end of file
+app = create_app(os.environ.get('FLASK_CONFIG', 'production'))
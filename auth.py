@@ -0,0 +1,108 @@
+"""Who is logged in.
+
+The session holds the user's id, which never changes, and their username, which is
+only used to build links and to check `<username>` in URLs without a query. The
+User row is loaded at most once per request, and only by routes that need it.
+
+Because require_user_id() doesn't check that the user still exists, a session whose
+account was deleted (e.g. from another browser) only shows up when a write by that
+user fails its foreign key. `is_missing_user()` recognizes that failure, and the app
+logs the session out and answers 401.
+"""
+
+from flask import g, session
+from werkzeug.exceptions import Unauthorized
+
+from models import User
+
+# Postgres SQLSTATE for a foreign key violation.
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+def login_user(user):
+    """Remember `user` as logged in."""
+
+    session["user_id"] = user.id
+    session["username"] = user.username
+
+
+def logout_user():
+    """Forget the logged-in user."""
+
+    session.pop("user_id", None)
+    session.pop("username", None)
+
+    g.pop("current_user", None)
+
+
+def current_user():
+    """Return the logged-in User, or None. Loaded once per request and kept on `g`."""
+
+    if "current_user" not in g:
+        user = None
+
+        if "user_id" in session:
+            user = User.query.get(session["user_id"])
+        elif "username" in session:
+            # Sessions from before the id was stored only have the username.
+            user = User.query.filter_by(username=session["username"]).first()
+
+            if user:
+                session["user_id"] = user.id
+
+        g.current_user = user
+
+    return g.current_user
+
+
+def current_user_id():
+    """Return the logged-in user's id, or None, without loading the user if the session has it."""
+
+    if "user_id" not in session and "username" in session:
+        current_user()
+
+    return session.get("user_id")
+
+
+def require_user(username=None):
+    """Return the logged-in User, raising Unauthorized if there is none.
+
+    With `username`, the logged-in user must also be that user; this is checked against
+    the session before anything is loaded.
+    """
+
+    if username is not None and session.get("username") != username:
+        raise Unauthorized()
+
+    user = current_user()
+
+    if user is None:
+        raise Unauthorized()
+
+    return user
+
+
+def require_user_id(username=None):
+    """Like require_user(), but only return the user's id, which usually needs no query."""
+
+    if username is not None and session.get("username") != username:
+        raise Unauthorized()
+
+    user_id = current_user_id()
+
+    if user_id is None:
+        raise Unauthorized()
+
+    return user_id
+
+
+def is_missing_user(error):
+    """Return True if IntegrityError `error` is a write referencing a user that doesn't exist."""
+
+    orig = error.orig
+
+    if getattr(orig, "pgcode", None) != FOREIGN_KEY_VIOLATION:
+        return False
+
+    # Postgres names every users.id reference "<table>_user_id_fkey".
+    return (orig.diag.constraint_name or "").endswith("_user_id_fkey")
@@ -0,0 +1,79 @@
+"""In-process caches shared by the API clients."""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded least-recently-used cache whose entries expire after `ttl` seconds.
+
+    Safe to share between the threads of a worker. Keeps hit/miss counters so we
+    can see how well the cache is doing.
+    """
+
+    def __init__(self, maxsize=512, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, or `default` if missing or expired."""
+
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+
+            # Expired entries are dropped on read.
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+
+            # Mark as most recently used.
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store `value` under `key`, evicting the least recently used entry if full."""
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Remove `key` from the cache if present."""
+
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Empty the cache and reset the counters."""
+
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return size and hit/miss counters as a dict."""
+
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,474 @@
+"""Keep our local copy of the upstream exercise and meal catalogs in sync with wger and TheMealDB.
+
+Syncs write with set-based `INSERT ... ON CONFLICT DO UPDATE` batches, one statement
+per table (or per upstream page), and commit once at the end, so a full sync is a
+handful of round trips rather than one per row. `sync_catalog()` runs every table in
+one transaction, so a failure partway leaves categories and the rows that reference
+them in step. Rows only get rewritten when
+something actually changed upstream.
+
+Every upstream resource has a SyncState row. Requests are conditional on the ETag /
+Last-Modified we saw last time, and responses whose body hashes the same as last time
+are skipped, so an incremental sync only processes what changed. A response with rows
+we had to skip (for an unknown category) isn't recorded, so the next sync retries it.
+
+Syncs run from `flask sync-catalog` or the optional background worker, never while
+handling a request.
+"""
+
+import hashlib
+import logging
+import os
+import string
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
+
+from sqlalchemy.dialects.postgresql import insert
+
+import http_client
+from models import db, Exercise, ExerciseCategory, Meal, MealCategory, MealIngredient, SyncState
+from mealdb import mealdb
+from sanitize import clean_description
+import wger
+from search_index import meal_index
+from exercise_catalog import exercise_catalog, VERSION_SOURCE
+
+logger = logging.getLogger(__name__)
+
+
+def store_meal(data, category_ids=None):
+    """Insert or update the local Meal for a TheMealDB record and return it.
+
+    `category_ids` maps category names to ids; pass it when storing many meals to
+    avoid a category query per meal. Returns None if we don't know the category.
+    """
+
+    category_name = str(data['strCategory'])
+
+    if category_ids is None:
+        category = MealCategory.query.filter_by(name=category_name).first()
+        category_id = category.id if category else None
+    else:
+        category_id = category_ids.get(category_name)
+
+    if category_id is None:
+        logger.warning("Skipping meal %s: unknown category %r", data['idMeal'], category_name)
+        return None
+
+    meal = Meal.query.get(int(data['idMeal'])) or Meal()
+
+    meal.update_from_api(data, category_id)
+
+    db.session.add(meal)
+
+    return meal
+
+
+def get_meal(meal_id):
+    """Return the Meal for `meal_id`, reading our local copy first.
+
+    Falls back to TheMealDB and stores the result for next time. Returns None if the
+    meal doesn't exist. Raises a `requests.RequestException` if we don't have the meal
+    and TheMealDB is down.
+    """
+
+    meal = Meal.query.get(meal_id)
+
+    if meal:
+        return meal
+
+    data = mealdb.lookup_meal(meal_id)
+
+    if not data:
+        return None
+
+    meal = store_meal(data)
+
+    if meal:
+        db.session.commit()
+
+    return meal
+
+
+def get_category_meals(category, page=1, per_page=24):
+    """Return one page of meals in `category` and the total number of meals in it.
+
+    Meals are dicts with `id`, `name` and `thumbnail_url`, ordered by name. Reads our
+    local copy; categories that haven't been synced yet are listed from TheMealDB's
+    (cached) category filter instead.
+    """
+
+    offset = (page - 1) * per_page
+
+    query = Meal.query.filter_by(category_id=category.id)
+
+    total = query.count()
+
+    if total:
+        meals = query.order_by(Meal.name).offset(offset).limit(per_page).all()
+
+        return [{"id": meal.id, "name": meal.name, "thumbnail_url": meal.thumbnail_url} for meal in meals], total
+
+    upstream_meals = sorted(mealdb.filter_by_category(category.name), key=lambda meal: meal['strMeal'])
+
+    meals = [{"id": int(meal['idMeal']), "name": meal['strMeal'], "thumbnail_url": meal['strMealThumb']} for meal in upstream_meals[offset:offset + per_page]]
+
+    return meals, len(upstream_meals)
+
+
+def upsert(model, rows, key="id"):
+    """Insert `rows` (dicts of column values) into `model`'s table, updating existing rows on `key`.
+
+    Rows whose values haven't changed are left alone. Returns the number of rows
+    inserted or updated.
+    """
+
+    if not rows:
+        return 0
+
+    table = model.__table__
+
+    stmt = insert(table).values(rows)
+
+    update_columns = [column for column in rows[0] if column != key]
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={column: stmt.excluded[column] for column in update_columns},
+        where=db.or_(*[table.c[column].is_distinct_from(stmt.excluded[column]) for column in update_columns]),
+    )
+
+    return db.session.execute(stmt).rowcount
+
+
+def fetch_if_changed(upstream, url, params=None, force=False):
+    """GET `url` unless it is unchanged since the last sync.
+
+    Returns `(data, state)`: `data` is the decoded JSON body, or None if the upstream
+    answered 304 or sent the same body as last time. `state` is the resource's
+    SyncState, updated in the current transaction so it is only saved together with
+    the rows written from this response. `force` ignores what we saw last time.
+    """
+
+    source = f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+    state = SyncState.query.get(source)
+
+    if state is None:
+        state = SyncState(source=source)
+        db.session.add(state)
+
+    headers = {}
+
+    if not force:
+        if state.etag:
+            headers['If-None-Match'] = state.etag
+        if state.last_modified:
+            headers['If-Modified-Since'] = state.last_modified
+
+    response = http_client.get(upstream, url, params=params, headers=headers)
+
+    now = datetime.utcnow()
+
+    state.last_run_at = now
+
+    if response.status_code == 304:
+        return None, state
+
+    response.raise_for_status()
+
+    state.etag = response.headers.get('ETag')
+    state.last_modified = response.headers.get('Last-Modified')
+
+    content_hash = hashlib.sha256(response.content).hexdigest()
+
+    if content_hash == state.content_hash and not force:
+        return None, state
+
+    state.content_hash = content_hash
+    state.last_changed_at = now
+
+    return response.json(), state
+
+
+def forget_response(state):
+    """Make the next sync fetch and process `state`'s resource again, even if it hasn't changed."""
+
+    state.etag = None
+    state.last_modified = None
+    state.content_hash = None
+
+
+def wger_page_fetcher(force=False, states=None):
+    """Return a `get_page` for wger.iter_pages that skips pages unchanged since the last sync.
+
+    Unchanged pages come back with no results, and the `next` link we stored for them.
+    Each page's SyncState is appended to `states`, if given.
+    """
+
+    def get_page(url, params=None):
+        page, state = fetch_if_changed('wger', url, params, force)
+
+        if states is not None:
+            states.append(state)
+
+        if page is None:
+            return {'results': [], 'next': state.next_url, 'count': None}
+
+        state.next_url = page.get('next')
+
+        return page
+
+    return get_page
+
+
+def touch_exercise_catalog():
+    """Record in the current transaction that the exercise catalog changed.
+
+    Every process's ExerciseCatalog notices the new version on its next check and rebuilds.
+    """
+
+    state = SyncState.query.get(VERSION_SOURCE)
+
+    if state is None:
+        state = SyncState(source=VERSION_SOURCE)
+        db.session.add(state)
+
+    state.last_changed_at = datetime.utcnow()
+
+
+def sync_exercise_categories(force=False, commit=True):
+    """Copy wger's exercise categories into the exercise_categories table.
+
+    With `commit=False` the caller commits, and invalidates exercise_catalog after.
+    """
+
+    items = wger.get_exercise_categories(get_page=wger_page_fetcher(force))
+
+    rows = {item['id']: {'id': item['id'], 'name': item['name']} for item in items}
+
+    count = upsert(ExerciseCategory, list(rows.values()))
+
+    if count:
+        touch_exercise_catalog()
+
+    if commit:
+        db.session.commit()
+
+        if count:
+            exercise_catalog.invalidate()
+
+    return count
+
+
+def sync_exercises(progress=None, force=False, commit=True):
+    """Copy every wger exercise into the exercises table, one upsert per changed page of results.
+
+    With `commit=False` the caller commits, and invalidates exercise_catalog after.
+    """
+
+    category_ids = {category_id for (category_id,) in db.session.query(ExerciseCategory.id)}
+
+    count = 0
+
+    states = []
+
+    for results in wger.iter_exercise_pages(progress=progress, get_page=wger_page_fetcher(force, states)):
+        rows = {}
+
+        for item in results:
+            if item['category'] not in category_ids:
+                logger.warning("Skipping exercise %s: unknown category %s", item['id'], item['category'])
+
+                # The page we just got; retry it once its category has been synced.
+                forget_response(states[-1])
+                continue
+
+            description_html, description_text = clean_description(item['description'])
+
+            # Keyed by id: Postgres can't update the same row twice in one statement.
+            rows[item['id']] = {
+                'id': item['id'],
+                'name': item['name'],
+                'description': item['description'],
+                'description_html': description_html,
+                'description_text': description_text,
+                'category_id': item['category'],
+            }
+
+        count += upsert(Exercise, list(rows.values()))
+
+    if count:
+        touch_exercise_catalog()
+
+    if commit:
+        db.session.commit()
+
+        if count:
+            exercise_catalog.invalidate()
+
+    return count
+
+
+def sync_meal_categories(force=False, commit=True):
+    """Copy TheMealDB's categories into the meal_categories table."""
+
+    result, state = fetch_if_changed('mealdb', f"{mealdb.base_url}/categories.php", force=force)
+
+    rows = {}
+
+    for item in (result or {}).get('categories') or []:
+        rows[int(item['idCategory'])] = {
+            'id': int(item['idCategory']),
+            'name': item['strCategory'],
+            'description': item['strCategoryDescription'],
+            'image_url': item['strCategoryThumb'],
+        }
+
+    count = upsert(MealCategory, list(rows.values()))
+
+    if commit:
+        db.session.commit()
+
+    return count
+
+
+def sync_meals(force=False, commit=True):
+    """Copy every TheMealDB recipe into the meals and meal_ingredients tables.
+
+    Returns the number of meals inserted or updated. With `commit=False` the caller
+    commits, and invalidates meal_index after.
+    """
+
+    category_ids = {name: category_id for (category_id, name) in db.session.query(MealCategory.id, MealCategory.name)}
+
+    count = 0
+
+    # TheMealDB has no "list everything" endpoint, but searching by each first letter covers the catalog.
+    for letter in string.ascii_lowercase:
+        result, state = fetch_if_changed('mealdb', f"{mealdb.base_url}/search.php", {'f': letter}, force)
+
+        if result is None:
+            continue
+
+        meals = {}
+        ingredients = []
+
+        for data in result['meals'] or []:
+            category_id = category_ids.get(str(data['strCategory']))
+
+            if category_id is None:
+                logger.warning("Skipping meal %s: unknown category %r", data['idMeal'], data['strCategory'])
+
+                # Retry this letter once the category has been synced.
+                forget_response(state)
+                continue
+
+            meals[int(data['idMeal'])] = Meal.columns_from_api(data, category_id)
+            ingredients.extend(Meal.ingredients_from_api(data))
+
+        if not meals:
+            continue
+
+        count += upsert(Meal, list(meals.values()))
+
+        # Ingredient rows have no natural key, so replace the whole batch.
+        db.session.execute(MealIngredient.__table__.delete().where(MealIngredient.meal_id.in_(list(meals))))
+
+        if ingredients:
+            db.session.execute(MealIngredient.__table__.insert(), ingredients)
+
+    if commit:
+        db.session.commit()
+
+        meal_index.invalidate()
+
+    return count
+
+
+def sync_catalog(progress=None, force=False):
+    """Sync the exercise and meal catalogs in one transaction. Categories go first so new rows can reference them.
+
+    Returns the number of rows inserted or updated per table. If any table fails,
+    nothing is saved, including what we recorded about the responses already seen.
+    """
+
+    counts = {}
+
+    try:
+        counts['exercise_categories'] = sync_exercise_categories(force, commit=False)
+        counts['meal_categories'] = sync_meal_categories(force, commit=False)
+        counts['exercises'] = sync_exercises(progress, force, commit=False)
+        counts['meals'] = sync_meals(force, commit=False)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if counts['exercise_categories'] or counts['exercises']:
+        exercise_catalog.invalidate()
+
+    meal_index.invalidate()
+
+    return counts
+
+
+def claim_scheduled_sync(interval):
+    """Claim the next scheduled sync if nobody has run one in the last `interval` seconds.
+
+    Uses a conditional update on the "catalog" SyncState row, so when several workers
+    wake up at once only one of them wins.
+    """
+
+    db.session.execute(insert(SyncState.__table__).values(source='catalog').on_conflict_do_nothing())
+
+    now = datetime.utcnow()
+
+    claimed = SyncState.query.filter(
+        SyncState.source == 'catalog',
+        db.or_(SyncState.last_run_at == None, SyncState.last_run_at < now - timedelta(seconds=interval)),
+    ).update({'last_run_at': now}, synchronize_session=False)
+
+    db.session.commit()
+
+    return bool(claimed)
+
+
+_worker = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+
+
+def start_sync_worker(app, interval):
+    """Start a daemon thread in this process that syncs the catalog every `interval` seconds.
+
+    Safe to call from every worker: the thread is started once per process, and each
+    sync is claimed through the database so only one process runs it.
+    """
+
+    global _worker, _worker_pid
+
+    with _worker_lock:
+        if _worker is not None and _worker_pid == os.getpid():
+            return
+
+        def run():
+            while True:
+                with app.app_context():
+                    try:
+                        if claim_scheduled_sync(interval):
+                            logger.info("Catalog sync: %s", sync_catalog())
+                    except Exception:
+                        logger.exception("Scheduled catalog sync failed")
+                        db.session.rollback()
+                    finally:
+                        db.session.remove()
+
+                time.sleep(interval)
+
+        _worker_pid = os.getpid()
+        _worker = threading.Thread(target=run, name="catalog-sync", daemon=True)
+        _worker.start()
@@ -0,0 +1,32 @@
+"""Read comment threads one page at a time, newest first.
+
+Pages are keyed on comment id (`before` is the id of the last comment already shown)
+instead of an offset, so every page is a short index range scan however deep into a
+thread the reader is. Each comment's author is loaded in the same query.
+"""
+
+from sqlalchemy.orm import joinedload
+
+
+def get_comment_page(model, per_page, before=None, **item):
+    """Return up to `per_page` comments on `item` older than comment `before`, newest first.
+
+    `model` is ExerciseComment or MealComment and `item` picks the thread, e.g.
+    `exercise_id=5`. Returns (comments, next_before), where `next_before` is the id to
+    ask for the following page with, or None if this is the last page.
+    """
+
+    query = model.query.options(joinedload(model.user)).filter_by(**item)
+
+    if before is not None:
+        query = query.filter(model.id < before)
+
+    # Fetch one extra row to find out whether there is another page.
+    rows = query.order_by(model.id.desc()).limit(per_page + 1).all()
+
+    comments = rows[:per_page]
+
+    next_before = comments[-1].id if len(rows) > per_page else None
+
+    return comments, next_before
+
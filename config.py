@@ -0,0 +1,88 @@
+"""Configuration profiles for the app. Pick one with the FLASK_CONFIG environment variable."""
+
+import os
+
+
+class Config:
+    """Settings shared by every profile."""
+
+    # Get DB_URI from environ variable (useful for production/testing) or,
+    # if not set there, use development local db.
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql:///capstone')
+
+    # Read replicas for GET requests, comma-separated in DATABASE_REPLICA_URLS. With none, the primary serves everything.
+    SQLALCHEMY_REPLICA_URIS = [url for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url]
+
+    # After a write request, that client's reads stay on the primary for this many seconds.
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+
+    # Connection pool for the primary and each replica (see db_pool.py). Each worker
+    # holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections per database and gives up
+    # after waiting DB_POOL_TIMEOUT seconds for one. Connections older than
+    # DB_POOL_RECYCLE seconds are replaced (0 never), and DB_POOL_PRE_PING tests each
+    # one before use so a dropped connection doesn't fail a request.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+
+    # Cancel any statement in a web request that runs longer than this many milliseconds.
+    # Background jobs, CLI commands and migrations run without a limit. 0 turns it off.
+    DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))
+
+    # Set to 1 when DATABASE_URL points at PgBouncer in transaction pooling mode.
+    # PgBouncer then does the pooling and the DB_POOL_* settings are ignored.
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', '0') == '1'
+
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ECHO = False
+
+    SECRET_KEY = os.environ.get('SECRET_KEY', "it's a secret")
+
+    # Seconds between background catalog syncs. 0 turns the background sync off.
+    CATALOG_SYNC_INTERVAL = int(os.environ.get('CATALOG_SYNC_INTERVAL', 0))
+
+    # Number of meals shown per page on meal category pages.
+    MEALS_PER_PAGE = int(os.environ.get('MEALS_PER_PAGE', 24))
+
+    # Number of comments shown at a time on exercise and meal pages.
+    COMMENTS_PER_PAGE = int(os.environ.get('COMMENTS_PER_PAGE', 20))
+
+    # Leaderboards rank items on this many days of activity and show this many items each.
+    LEADERBOARD_DAYS = int(os.environ.get('LEADERBOARD_DAYS', 30))
+    LEADERBOARD_SIZE = int(os.environ.get('LEADERBOARD_SIZE', 5))
+
+    # RapidAPI key for the exercise image search. Without one, `flask resolve-exercise-images` does nothing.
+    RAPIDAPI_KEY = os.environ.get('RAPIDAPI_KEY')
+
+    # If set, /status/upstreams requires this token in the X-Status-Token header.
+    STATUS_TOKEN = os.environ.get('STATUS_TOKEN')
+
+    # Load Flask-DebugToolbar. Only the development profile turns this on.
+    DEBUG_TOOLBAR = False
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    DEBUG_TOOLBAR = True
+    DEBUG_TB_INTERCEPT_REDIRECTS = False
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql:///capstone-test')
+
+    # Don't have WTForms use CSRF at all, since it's a pain to test
+    WTF_CSRF_ENABLED = False
+
+
+class ProductionConfig(Config):
+    pass
+
+
+configs = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+}
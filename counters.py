@@ -0,0 +1,187 @@
+"""Comment and favorite counts per exercise and meal.
+
+Counting rows on every page view gets slower as the comment and favorite tables
+grow, so each item has a counter row instead. Every write that adds or removes a
+comment or favorite calls `bump()` in the same transaction, and reading the counts
+is a primary key lookup. `flask reconcile-counters` recomputes them all from the
+source tables in case they ever drift.
+
+`bump()` also adds the change to the item's daily row in the activity tables, which
+leaderboards.py ranks items from: additions to today's row, removals to the row of
+the day the comment or favorite was added.
+"""
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import exists, select
+
+from models import db, ExerciseCounter, MealCounter, ExerciseActivity, MealActivity, ExerciseComment, MealComment, UserExercise, UserMeal
+
+# The item column of the comments and favorites tables each counter table counts.
+SOURCES = {
+    ExerciseCounter: (ExerciseComment.exercise_id, UserExercise.exercise_id),
+    MealCounter: (MealComment.meal_id, UserMeal.meal_id),
+}
+
+# The daily activity table each counter table's changes are also added to.
+ACTIVITY = {
+    ExerciseCounter: ExerciseActivity,
+    MealCounter: MealActivity,
+}
+
+
+def key_column(counter):
+    """Return the item id column of a counter table."""
+
+    return counter.__table__.primary_key.columns.values()[0]
+
+
+def get_counts(counter, item_id):
+    """Return the counter row for an item, or an unsaved one with zero counts."""
+
+    return counter.query.get(item_id) or counter(comment_count=0, favorite_count=0)
+
+
+def bump(counter, item_id, comments=0, favorites=0, added_on=None):
+    """Add `comments` and `favorites` (either may be negative) to an item's counts and activity.
+
+    Additions count towards today's activity. Removals come off the activity of
+    `added_on`, the day the removed comment or favorite was added, so taking away one
+    that is older than any leaderboard window (or from before activity was recorded,
+    when `added_on` is None) doesn't count against the item's recent activity.
+    """
+
+    table = counter.__table__
+    key = key_column(counter)
+
+    stmt = insert(table).values({
+        key.name: item_id,
+        "comment_count": max(comments, 0),
+        "favorite_count": max(favorites, 0),
+    })
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={
+            "comment_count": db.func.greatest(table.c.comment_count + comments, 0),
+            "favorite_count": db.func.greatest(table.c.favorite_count + favorites, 0),
+        },
+    )
+
+    db.session.execute(stmt)
+
+    activity = ACTIVITY[counter].__table__
+
+    changes = {
+        "comment_count": activity.c.comment_count + comments,
+        "favorite_count": activity.c.favorite_count + favorites,
+    }
+
+    if comments < 0 or favorites < 0:
+        # A day's row that has already been pruned is past every window, so there's nothing to take off.
+        if added_on is not None:
+            db.session.execute(
+                activity.update().values(changes).where(activity.c[key.name] == item_id).where(activity.c.day == added_on)
+            )
+
+        return
+
+    stmt = insert(activity).values({
+        key.name: item_id,
+        "day": db.func.current_date(),
+        "comment_count": comments,
+        "favorite_count": favorites,
+    })
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[activity.c[key.name], activity.c.day],
+        set_=changes,
+    )
+
+    db.session.execute(stmt)
+
+
+def release_user(user_id):
+    """Take a user's comments and favorites off every counter, ahead of deleting the user.
+
+    Also takes them off the activity of the days they were added, so they stop
+    counting towards the leaderboards. One UPDATE per counter column and one per
+    activity column, however many comments and favorites the user has.
+    """
+
+    for counter, columns in SOURCES.items():
+        table = counter.__table__
+        key = key_column(counter)
+        activity = ACTIVITY[counter].__table__
+
+        for column, field in zip(columns, ("comment_count", "favorite_count")):
+            source = column.table
+
+            counts = db.session.query(column.label("item_id"), db.func.count().label("n")).filter(
+                source.c.user_id == user_id,
+            ).group_by(column).subquery()
+
+            db.session.execute(
+                table.update()
+                .values({field: db.func.greatest(table.c[field] - counts.c.n, 0)})
+                .where(key == counts.c.item_id)
+            )
+
+            daily = db.session.query(column.label("item_id"), source.c.added_on.label("day"), db.func.count().label("n")).filter(
+                source.c.user_id == user_id,
+                source.c.added_on != None,
+            ).group_by(column, source.c.added_on).subquery()
+
+            db.session.execute(
+                activity.update()
+                .values({field: activity.c[field] - daily.c.n})
+                .where(activity.c[key.name] == daily.c.item_id)
+                .where(activity.c.day == daily.c.day)
+            )
+
+
+def reconcile(counter):
+    """Recompute every count in `counter`'s table from the comments and favorites tables.
+
+    Runs as two set-based statements and returns the number of counter rows that
+    changed. Comments or favorites written while it runs can make it a little off;
+    the next run puts that right.
+    """
+
+    table = counter.__table__
+    key = key_column(counter)
+    comment_column, favorite_column = SOURCES[counter]
+
+    comments = db.session.query(comment_column.label("item_id"), db.func.count().label("n")).group_by(comment_column).subquery()
+    favorites = db.session.query(favorite_column.label("item_id"), db.func.count().label("n")).group_by(favorite_column).subquery()
+
+    counts = select([
+        db.func.coalesce(comments.c.item_id, favorites.c.item_id),
+        db.func.coalesce(comments.c.n, 0),
+        db.func.coalesce(favorites.c.n, 0),
+    ]).select_from(comments.outerjoin(favorites, comments.c.item_id == favorites.c.item_id, full=True))
+
+    stmt = insert(table).from_select([key.name, "comment_count", "favorite_count"], counts)
+
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={"comment_count": stmt.excluded.comment_count, "favorite_count": stmt.excluded.favorite_count},
+        where=db.or_(
+            table.c.comment_count != stmt.excluded.comment_count,
+            table.c.favorite_count != stmt.excluded.favorite_count,
+        ),
+    )
+
+    changed = db.session.execute(stmt).rowcount
+
+    # Items whose last comment and favorite are gone don't show up above.
+    emptied = table.update().values(comment_count=0, favorite_count=0).where(
+        db.or_(table.c.comment_count != 0, table.c.favorite_count != 0),
+    ).where(
+        ~exists().where(comment_column == key),
+    ).where(
+        ~exists().where(favorite_column == key),
+    )
+
+    changed += db.session.execute(emptied).rowcount
+
+    return changed
@@ -0,0 +1,189 @@
+"""Database connection pool settings and usage stats.
+
+Pool sizing, recycling, pre-ping and the per-statement timeout come from the DB_*
+settings in config.py and are checked when the app is created, so a bad value fails
+at startup instead of on the first query.
+
+The statement timeout is for web requests. It is set when a connection is opened,
+and background jobs and CLI commands (the catalog sync, counter reconciliation,
+leaderboard refreshes) switch it off with SET LOCAL at the start of each of their
+transactions, so long bulk statements aren't cancelled. Migrations switch it off in
+migrations/env.py.
+
+Behind PgBouncer in transaction pooling mode (DB_PGBOUNCER), PgBouncer does the
+pooling: we open a connection per checkout (NullPool), and web requests set the
+statement timeout with SET LOCAL at the start of each transaction instead, since
+PgBouncer won't pass startup options through and a session-level SET would leak to
+other clients.
+
+Every pool keeps counters of how many connections are in use and how long checkouts
+waited, which /status/upstreams reports.
+"""
+
+import threading
+import time
+
+from flask import has_request_context
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class PoolStats:
+    """Checkout counters for one engine's pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, waited, timed_out=False):
+        with self._lock:
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+            if timed_out:
+                self.timeouts += 1
+                return
+
+            self.checkouts += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+
+    def record_checkin(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def stats(self):
+        """Return the counters as a dict. Wait times are in seconds."""
+
+        with self._lock:
+            return {
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_total": round(self.wait_total, 3),
+                "wait_avg": round(self.wait_total / self.checkouts, 4) if self.checkouts else 0.0,
+                "wait_max": round(self.wait_max, 3),
+            }
+
+
+class TimedPoolMixin:
+    """Pool that times every checkout and counts connections in use in `self.pool_stats`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.pool_stats = PoolStats()
+
+    def _do_get(self):
+        start = time.monotonic()
+
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.pool_stats.record_checkout(time.monotonic() - start, timed_out=True)
+            raise
+
+        self.pool_stats.record_checkout(time.monotonic() - start)
+
+        return conn
+
+    def _do_return_conn(self, conn):
+        self.pool_stats.record_checkin()
+
+        super()._do_return_conn(conn)
+
+    def recreate(self):
+        # Keep counting across dispose(), which swaps in a fresh pool.
+        pool = super().recreate()
+        pool.pool_stats = self.pool_stats
+
+        return pool
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+
+def int_setting(config, key, minimum=0):
+    """Return config[key] as an int, raising ValueError if it isn't one or is below `minimum`."""
+
+    try:
+        value = int(config[key])
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be an integer, not {config[key]!r}")
+
+    if value < minimum:
+        raise ValueError(f"{key} must be at least {minimum}, not {value}")
+
+    return value
+
+
+def engine_options(config):
+    """Return create_engine() options for the DB_* settings in `config`.
+
+    Raises ValueError for settings that are out of range.
+    """
+
+    timeout = int_setting(config, 'DB_STATEMENT_TIMEOUT')
+
+    if config['DB_PGBOUNCER']:
+        return {"poolclass": TimedNullPool}
+
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": int_setting(config, 'DB_POOL_SIZE', minimum=1),
+        "max_overflow": int_setting(config, 'DB_MAX_OVERFLOW'),
+        "pool_timeout": int_setting(config, 'DB_POOL_TIMEOUT', minimum=1),
+        "pool_recycle": int_setting(config, 'DB_POOL_RECYCLE') or -1,
+        "pool_pre_ping": bool(config['DB_POOL_PRE_PING']),
+    }
+
+    if timeout:
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+
+    return options
+
+
+def set_local_statement_timeout(session, transaction, connection):
+    """Adjust the statement timeout for the transaction `session` just began on `connection`.
+
+    Web requests get DB_STATEMENT_TIMEOUT, which normally comes with the connection
+    already; anything else runs without one.
+    """
+
+    config = session.app.config
+
+    if not config['DB_STATEMENT_TIMEOUT']:
+        return
+
+    if has_request_context():
+        if config['DB_PGBOUNCER']:
+            connection.execute(f"SET LOCAL statement_timeout = {int(config['DB_STATEMENT_TIMEOUT'])}")
+    elif not config['DB_PGBOUNCER']:
+        connection.execute("SET LOCAL statement_timeout = 0")
+
+
+def stats(engine):
+    """Return `engine`'s pool settings and checkout counters as a dict."""
+
+    pool = engine.pool
+
+    result = {"pool": type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        result.update(size=pool.size(), overflow=max(pool.overflow(), 0), idle=pool.checkedin())
+
+    if isinstance(pool, TimedPoolMixin):
+        result.update(pool.pool_stats.stats())
+
+    return result
@@ -0,0 +1,92 @@
+"""In-process copy of the exercise categories and their exercises for the public listing pages."""
+
+import threading
+import time
+
+from models import db, Exercise, ExerciseCategory, SyncState
+
+# SyncState row the catalog sync touches whenever it writes exercises or categories.
+VERSION_SOURCE = "exercise-catalog"
+
+
+class ExerciseCatalog:
+    """Exercise categories and the exercises in each, kept in memory.
+
+    The exercise catalog only changes when the catalog sync writes to it, so the
+    listing pages are served from here without any SQL. A sync in this process calls
+    `invalidate()`; one in another process (`flask sync-catalog`, or the background
+    worker in another gunicorn worker) is noticed by reading the catalog's version at
+    most once every `check_interval` seconds.
+    """
+
+    def __init__(self, check_interval=30):
+        self.check_interval = check_interval
+        self.version = None
+        self.built_at = None
+        self.checked_at = None
+        self._categories = []
+        self._by_category = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Mark the catalog as stale so the next read rebuilds it."""
+
+        self.built_at = None
+
+    def current_version(self):
+        """Return when the catalog sync last wrote exercises or categories, or None."""
+
+        state = SyncState.query.get(VERSION_SOURCE)
+
+        return state.last_changed_at if state else None
+
+    def build(self, version=None):
+        """Rebuild the catalog from the database."""
+
+        categories = [{"id": id, "name": name} for (id, name) in db.session.query(ExerciseCategory.id, ExerciseCategory.name).order_by(ExerciseCategory.id)]
+
+        by_category = {category["id"]: {"category": category, "exercises": []} for category in categories}
+
+        for (id, name, category_id) in db.session.query(Exercise.id, Exercise.name, Exercise.category_id).order_by(Exercise.id):
+            by_category[category_id]["exercises"].append({"id": id, "name": name, "category_id": category_id})
+
+        # Swap everything in at once so concurrent readers never see a half-built catalog.
+        self._categories = categories
+        self._by_category = by_category
+        self.version = version
+        self.built_at = self.checked_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Rebuild the catalog if it has never been built, was invalidated, or the sync has written since."""
+
+        if self.built_at is not None and time.monotonic() - self.checked_at < self.check_interval:
+            return
+
+        with self._lock:
+            if self.built_at is not None and time.monotonic() - self.checked_at < self.check_interval:
+                return
+
+            # Read the version before the rows, so a sync committing in between is picked up next time.
+            version = self.current_version()
+
+            if self.built_at is None or version != self.version:
+                self.build(version)
+            else:
+                self.checked_at = time.monotonic()
+
+    def categories(self):
+        """Return every exercise category as a dict with `id` and `name`."""
+
+        self.ensure_fresh()
+
+        return self._categories
+
+    def category(self, category_id):
+        """Return {"category": ..., "exercises": [...]} for a category, or None if there's no such category."""
+
+        self.ensure_fresh()
+
+        return self._by_category.get(category_id)
+
+
+exercise_catalog = ExerciseCatalog()
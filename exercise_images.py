@@ -0,0 +1,95 @@
+"""Resolve exercise images on the server and store them in the exercise_images table.
+
+wger's own image URLs don't work, so we take the first result of a Contextual Web
+image search for the exercise name. Lookups happen from `flask resolve-exercise-images`
+(run after a catalog sync or on a schedule), never while serving a page. The search
+needs a RapidAPI key (RAPIDAPI_KEY); without one, nothing is looked up.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+import requests
+from flask import current_app
+from sqlalchemy.orm import contains_eager
+
+import http_client
+from models import db, Exercise, ExerciseImage
+
+logger = logging.getLogger(__name__)
+
+SEARCH_URL = "https://contextualwebsearch-websearch-v1.p.rapidapi.com/api/Search/ImageSearchAPI"
+
+API_HOST = "contextualwebsearch-websearch-v1.p.rapidapi.com"
+
+# Found images are re-checked after this long; empty results are retried sooner.
+MAX_AGE = timedelta(days=30)
+MISSING_MAX_AGE = timedelta(days=1)
+
+
+def search_image(exercise_name, api_key):
+    """Return the URL of the first image search result for an exercise, or None."""
+
+    result = http_client.get_json(
+        "image_search",
+        SEARCH_URL,
+        params={"q": f"{exercise_name} Exercise", "pageNumber": "1", "pageSize": "10", "autoCorrect": "true"},
+        headers={"x-rapidapi-key": api_key, "x-rapidapi-host": API_HOST},
+    )
+
+    images = result.get("value") or []
+
+    return images[0]["url"] if images else None
+
+
+def exercises_needing_images(now=None):
+    """Return exercises that have no image yet or whose image is due for a refresh."""
+
+    now = now or datetime.utcnow()
+
+    stale = db.or_(
+        ExerciseImage.exercise_id == None,
+        db.and_(ExerciseImage.url != None, ExerciseImage.fetched_at < now - MAX_AGE),
+        db.and_(ExerciseImage.url == None, ExerciseImage.fetched_at < now - MISSING_MAX_AGE),
+    )
+
+    # Load each exercise's image from the same join instead of one query per exercise.
+    return Exercise.query.outerjoin(ExerciseImage).options(contains_eager(Exercise.image)).filter(stale).order_by(Exercise.id).all()
+
+
+def resolve_images(exercises=None, api_key=None):
+    """Look up and store images for `exercises` (default: the ones needing it).
+
+    `api_key` defaults to the RAPIDAPI_KEY setting. Commits after each exercise so
+    progress survives an interrupted run. Returns the number of exercises updated, or
+    None if there is no API key.
+    """
+
+    api_key = api_key or current_app.config['RAPIDAPI_KEY']
+
+    if not api_key:
+        logger.warning("RAPIDAPI_KEY isn't set, not looking up exercise images.")
+        return None
+
+    if exercises is None:
+        exercises = exercises_needing_images()
+
+    count = 0
+
+    for exercise in exercises:
+        try:
+            url = search_image(exercise.name, api_key)
+        except (requests.RequestException, ValueError, KeyError) as e:
+            logger.warning("Image search for exercise %s failed: %s", exercise.id, e)
+            continue
+
+        image = exercise.image or ExerciseImage(exercise_id=exercise.id)
+        image.url = url
+        image.fetched_at = datetime.utcnow()
+
+        db.session.add(image)
+        db.session.commit()
+
+        count += 1
+
+    return count
@@ -0,0 +1,293 @@
+"""Shared outbound HTTP layer for the external APIs we call.
+
+Every upstream gets its own pooled `requests.Session`, so TCP/TLS connections are
+kept alive and reused between requests, plus its own timeouts and retry policy.
+Call sites go through `get()` / `get_json()` instead of calling `requests.get`.
+
+Calls that don't depend on each other can be started together with `submit()` or
+`fan_out()`, which run them on a small shared thread pool, so the caller waits for
+the slowest call instead of the sum of all of them. The news feed's background
+refresh runs its Guardian queries this way. No view calls upstreams concurrently any
+more: the homepage reads the news feed's cached results, and the meal views read from
+our local copy of TheMealDB, falling back to at most one lookup.
+
+Each upstream also has a circuit breaker. After `failure_threshold` consecutive
+failures (connection errors, timeouts, 429 or 5xx responses) it opens and calls fail
+immediately with `CircuitOpenError` for `reset_timeout` seconds; then one trial call
+is let through to see if the upstream has recovered. Every error raised from here is
+a `requests.RequestException`, so callers only have one thing to catch.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamError(requests.RequestException):
+    """An upstream API couldn't give us a usable answer."""
+
+
+class CircuitOpenError(UpstreamError):
+    """The upstream's circuit breaker is open, so the call wasn't attempted."""
+
+
+class CircuitBreaker:
+    """Stops calling an upstream for a while after it keeps failing."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.failures = 0
+        self.trips = 0
+        self.rejected = 0
+        self.opened_at = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go ahead right now."""
+
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+
+            if self.state != self.CLOSED and time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Let a single trial call through. If it never reports back (say the
+                # worker was interrupted), another one goes after `reset_timeout`.
+                self.state = self.HALF_OPEN
+                self.opened_at = time.monotonic()
+                return
+
+            self.rejected += 1
+
+        raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                    logger.warning("Circuit for %s opened after %s failures: %s", self.name, self.consecutive_failures, error)
+
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        """Return the breaker's state and counters as a dict."""
+
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failures": self.failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "last_error": self.last_error,
+            }
+
+
+class Upstream:
+    """Connection, timeout, retry and circuit breaker settings for one external API."""
+
+    def __init__(self, name, connect_timeout=3.05, read_timeout=10, retries=2, backoff_factor=0.3, pool_maxsize=10, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+
+    def make_session(self):
+        """Build a session with a pooled, retrying adapter for this upstream."""
+
+        retry = Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            raise_on_status=False,
+        )
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        return session
+
+
+UPSTREAMS = {
+    "guardian": Upstream("guardian", read_timeout=5),
+    "mealdb": Upstream("mealdb", read_timeout=5),
+    # wger's paginated catalog endpoints are slow; they're only called from the catalog sync.
+    "wger": Upstream("wger", read_timeout=30),
+    "image_search": Upstream("image_search", read_timeout=10, retries=1),
+}
+
+# Upper bound on outbound calls running at once per process.
+MAX_CONCURRENT_CALLS = 8
+
+# Default time a fan-out waits for all of its calls, in seconds.
+FAN_OUT_TIMEOUT = 8
+
+_sessions = {}
+_sessions_pid = None
+_executor = None
+_executor_pid = None
+_lock = threading.Lock()
+
+
+def get_session(upstream):
+    """Return the shared session for `upstream`, creating it on first use.
+
+    Sessions are per process, so workers forked from a preloaded master don't share
+    sockets with it.
+    """
+
+    global _sessions_pid
+
+    with _lock:
+        if _sessions_pid != os.getpid():
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+
+        session = _sessions.get(upstream)
+
+        if session is None:
+            session = UPSTREAMS[upstream].make_session()
+            _sessions[upstream] = session
+
+        return session
+
+
+def get(upstream, url, **kwargs):
+    """Send a GET request to `upstream` using its pooled session and default timeout.
+
+    Raises CircuitOpenError without sending anything while the upstream's breaker is
+    open, and UpstreamError for errors that aren't already a RequestException.
+    """
+
+    breaker = UPSTREAMS[upstream].breaker
+
+    breaker.before_call()
+
+    kwargs.setdefault("timeout", UPSTREAMS[upstream].timeout)
+
+    try:
+        response = get_session(upstream).get(url, **kwargs)
+    except requests.RequestException as e:
+        breaker.record_failure(e)
+        raise
+    except Exception as e:
+        # Anything else (a bad URL, a broken adapter) also settles a half-open trial call.
+        breaker.record_failure(e)
+        raise UpstreamError(f"{upstream} request failed: {e!r}") from e
+
+    # 429s and 5xxs are retried by the session, so getting one back means the retries ran out.
+    if response.status_code >= 500 or response.status_code == 429:
+        breaker.record_failure(f"HTTP {response.status_code}")
+    else:
+        breaker.record_success()
+
+    return response
+
+
+def get_json(upstream, url, **kwargs):
+    """Send a GET request to `upstream` and return the decoded JSON body.
+
+    Raises `requests.HTTPError` for error responses and UpstreamError if the body
+    isn't valid JSON.
+    """
+
+    response = get(upstream, url, **kwargs)
+
+    response.raise_for_status()
+
+    try:
+        return response.json()
+    except ValueError as e:
+        UPSTREAMS[upstream].breaker.record_failure(e)
+
+        raise UpstreamError(f"{upstream} returned invalid JSON: {e}", response=response)
+
+
+def stats():
+    """Return every upstream's circuit breaker state and counters, keyed by upstream."""
+
+    return {name: upstream.breaker.stats() for name, upstream in UPSTREAMS.items()}
+
+
+def get_executor():
+    """Return this process's thread pool for concurrent outbound calls."""
+
+    global _executor, _executor_pid
+
+    with _lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CALLS, thread_name_prefix="upstream")
+            _executor_pid = os.getpid()
+
+        return _executor
+
+
+def submit(fn, *args, **kwargs):
+    """Start `fn(*args, **kwargs)` on the outbound thread pool and return its future.
+
+    `fn` should only do HTTP work: it runs outside the request's app context.
+    """
+
+    return get_executor().submit(fn, *args, **kwargs)
+
+
+def fan_out(calls, timeout=FAN_OUT_TIMEOUT):
+    """Run every call in `calls` ({name: zero-argument function}) at once.
+
+    Waits until they have all finished or `timeout` seconds have passed, whichever
+    comes first, and returns {name: result}. A call that raised maps to its exception,
+    and one still running at the deadline maps to a `TimeoutError`.
+    """
+
+    futures = {name: submit(call) for name, call in calls.items()}
+
+    wait(futures.values(), timeout=timeout)
+
+    results = {}
+
+    for name, future in futures.items():
+        if not future.done():
+            future.cancel()
+            results[name] = TimeoutError(f"{name} did not finish within {timeout}s")
+        elif future.exception() is not None:
+            results[name] = future.exception()
+        else:
+            results[name] = future.result()
+
+    return results
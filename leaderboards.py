@@ -0,0 +1,202 @@
+"""Most favorited and most discussed exercises and meals, overall and per category.
+
+Ranking items live would mean grouping the comment and favorite tables on every
+page view. Instead, counters.bump() adds each new comment or favorite to the item's
+row for the day in exercise_activity / meal_activity (and takes it off that row again
+if it's removed), and `refresh()` ranks items on the last `days` days of those rows
+and stores the top `size` of every board in leaderboard_entries. Reading every board
+is then one small query.
+
+Run `flask refresh-leaderboards` on a schedule (e.g. hourly) to keep the boards
+current. Each refresh replaces every board in one transaction, so readers see
+either the old boards or the new ones.
+
+The boards only change when they're refreshed, so each process keeps them in memory
+(`leaderboard_cache`) and pages read them from there without any SQL.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, literal, select
+
+from models import db, Exercise, Meal, ExerciseActivity, MealActivity, LeaderboardEntry, SyncState
+
+# Per kind of item: its daily activity table, the activity table's item column and the item table.
+SOURCES = {
+    "exercises": (ExerciseActivity, ExerciseActivity.exercise_id, Exercise),
+    "meals": (MealActivity, MealActivity.meal_id, Meal),
+}
+
+# Board name suffix for each activity column that items are ranked on.
+METRICS = {
+    "favorited": "favorite_count",
+    "discussed": "comment_count",
+}
+
+# category_id of the boards that span every category.
+ALL_CATEGORIES = 0
+
+# SyncState row `refresh()` touches whenever it rewrites the boards.
+VERSION_SOURCE = "leaderboards"
+
+
+def board_name(kind, metric):
+    """Return the name of the `metric` board for `kind`, e.g. "exercises-favorited"."""
+
+    return f"{kind}-{metric}"
+
+
+class LeaderboardCache:
+    """Every board's entries, kept in memory.
+
+    A refresh in this process calls `invalidate()`; one in another process (`flask
+    refresh-leaderboards`) is noticed by reading the boards' version at most once every
+    `check_interval` seconds.
+    """
+
+    def __init__(self, check_interval=30):
+        self.check_interval = check_interval
+        self.version = None
+        self.built_at = None
+        self.checked_at = None
+        self._boards = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Mark the boards as stale so the next read reloads them."""
+
+        self.built_at = None
+
+    def current_version(self):
+        """Return when the boards were last refreshed, or None."""
+
+        state = SyncState.query.get(VERSION_SOURCE)
+
+        return state.last_changed_at if state else None
+
+    def build(self, version=None):
+        """Load every board's entries from the database, with one query."""
+
+        metrics = {board_name(kind, metric): (kind, metric) for kind in SOURCES for metric in METRICS}
+
+        boards = {}
+
+        entries = db.session.query(
+            LeaderboardEntry.board,
+            LeaderboardEntry.category_id,
+            LeaderboardEntry.item_id,
+            LeaderboardEntry.item_category_id,
+            LeaderboardEntry.name,
+            LeaderboardEntry.score,
+        ).order_by(LeaderboardEntry.board, LeaderboardEntry.category_id, LeaderboardEntry.rank)
+
+        for (board, category_id, item_id, item_category_id, name, score) in entries:
+            kind, metric = metrics[board]
+
+            boards.setdefault((kind, category_id), {metric: [] for metric in METRICS})[metric].append(
+                {"item_id": item_id, "item_category_id": item_category_id, "name": name, "score": score}
+            )
+
+        # Swap everything in at once so concurrent readers never see half-loaded boards.
+        self._boards = boards
+        self.version = version
+        self.built_at = self.checked_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Reload the boards if they've never been loaded, were invalidated, or have been refreshed since."""
+
+        if self.built_at is not None and time.monotonic() - self.checked_at < self.check_interval:
+            return
+
+        with self._lock:
+            if self.built_at is not None and time.monotonic() - self.checked_at < self.check_interval:
+                return
+
+            # Read the version before the entries, so a refresh committing in between is picked up next time.
+            version = self.current_version()
+
+            if self.built_at is None or version != self.version:
+                self.build(version)
+            else:
+                self.checked_at = time.monotonic()
+
+    def get_boards(self, kind, category_id=ALL_CATEGORIES):
+        """Return {metric: [entry, ...]} for `kind` ("exercises" or "meals"), best first.
+
+        Each entry is a dict with `item_id`, `item_category_id`, `name` and `score`.
+        Boards that have no entries (for example, before the first refresh) are empty lists.
+        """
+
+        self.ensure_fresh()
+
+        return self._boards.get((kind, category_id)) or {metric: [] for metric in METRICS}
+
+
+def refresh(days, size):
+    """Rebuild every board from the last `days` days of activity, keeping the top `size` of each.
+
+    Also deletes activity older than that, which no board can use, and bumps the
+    boards' version so every process reloads them. Returns the number of leaderboard
+    entries written. The caller commits.
+    """
+
+    cutoff = func.current_date() - days
+
+    LeaderboardEntry.query.delete(synchronize_session=False)
+
+    written = 0
+
+    for kind, (activity, item_column, item_model) in SOURCES.items():
+        for metric, column in METRICS.items():
+            totals = db.session.query(
+                item_column.label("item_id"),
+                func.sum(activity.__table__.c[column]).label("score"),
+            ).filter(activity.day > cutoff).group_by(item_column).having(func.sum(activity.__table__.c[column]) > 0).subquery()
+
+            # Rank every item both across all categories and within its own category.
+            ranked = select([
+                item_model.id.label("item_id"),
+                item_model.category_id.label("item_category_id"),
+                item_model.name.label("name"),
+                totals.c.score.label("score"),
+                func.row_number().over(order_by=(totals.c.score.desc(), item_model.id)).label("overall_rank"),
+                func.row_number().over(partition_by=item_model.category_id, order_by=(totals.c.score.desc(), item_model.id)).label("category_rank"),
+            ]).select_from(totals.join(item_model, item_model.id == totals.c.item_id)).alias("ranked")
+
+            for category_id, rank in ((literal(ALL_CATEGORIES), ranked.c.overall_rank), (ranked.c.item_category_id, ranked.c.category_rank)):
+                # Labelled, since the per-category boards select item_category_id twice.
+                rows = select([
+                    literal(board_name(kind, metric)).label("board"),
+                    category_id.label("category_id"),
+                    rank.label("rank"),
+                    ranked.c.item_id,
+                    ranked.c.item_category_id,
+                    ranked.c.name,
+                    ranked.c.score,
+                ]).where(rank <= size)
+
+                result = db.session.execute(LeaderboardEntry.__table__.insert().from_select(
+                    ["board", "category_id", "rank", "item_id", "item_category_id", "name", "score"],
+                    rows,
+                ))
+
+                written += result.rowcount
+
+        activity.query.filter(activity.day <= cutoff).delete(synchronize_session=False)
+
+    state = SyncState.query.get(VERSION_SOURCE)
+
+    if state is None:
+        state = SyncState(source=VERSION_SOURCE)
+        db.session.add(state)
+
+    state.last_changed_at = datetime.utcnow()
+
+    leaderboard_cache.invalidate()
+
+    return written
+
+
+leaderboard_cache = LeaderboardCache()
@@ -0,0 +1,67 @@
+"""Client for TheMealDB API (https://www.themealdb.com/api.php)."""
+
+import http_client
+from cache import TTLCache
+
+BASE_URL = "https://www.themealdb.com/api/json/v1/1"
+
+# Marker stored in the cache for meal ids TheMealDB doesn't know about.
+_MISSING = object()
+
+
+class MealDBClient:
+    """Looks up meals on TheMealDB, keeping recently used meal records in memory."""
+
+    def __init__(self, base_url=BASE_URL, maxsize=512, ttl=3600, missing_ttl=300):
+        self.base_url = base_url
+        self.missing_ttl = missing_ttl
+        self.meals = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.category_meals = TTLCache(maxsize=64, ttl=ttl)
+
+    def lookup_meal(self, meal_id):
+        """Return the meal record for `meal_id` as a dict, or None if it doesn't exist."""
+
+        key = int(meal_id)
+
+        meal = self.meals.get(key)
+
+        if meal is _MISSING:
+            return None
+
+        if meal is not None:
+            return meal
+
+        meals = http_client.get_json("mealdb", f"{self.base_url}/lookup.php", params={"i": key}).get("meals")
+
+        if not meals:
+            # Remember unknown ids for a shorter time so bad links don't hit the API every time.
+            self.meals.set(key, _MISSING, ttl=self.missing_ttl)
+            return None
+
+        meal = meals[0]
+
+        self.meals.set(key, meal)
+
+        return meal
+
+    def filter_by_category(self, category_name):
+        """Return the short meal records (id, name, thumbnail) for a category."""
+
+        meals = self.category_meals.get(category_name)
+
+        if meals is not None:
+            return meals
+
+        meals = http_client.get_json("mealdb", f"{self.base_url}/filter.php", params={"c": category_name}).get("meals") or []
+
+        self.category_meals.set(category_name, meals)
+
+        return meals
+
+    def stats(self):
+        """Return cache statistics for the meal lookups and category listings."""
+
+        return {"meals": self.meals.stats(), "category_meals": self.category_meals.stats()}
+
+
+mealdb = MealDBClient()
@@ -0,0 +1,33 @@
+"""activity days of comments and favorites
+
+Record the day each comment and favorite was added, so removing one takes it off that
+day's activity. Rows that already exist keep a null day: they were added before this
+and, if they counted towards any activity, it can't be told which day's.
+
+Revision ID: 7661c61df76f
+Revises: f2c8b1e50a9c
+Create Date: 2026-10-18 17:10:07.905091
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7661c61df76f'
+down_revision = 'f2c8b1e50a9c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add the columns first and set the default after, so existing rows stay null
+    # instead of all getting today's date.
+    for table in ('exercise_comments', 'meal_comments', 'user_exercises', 'user_meals'):
+        op.add_column(table, sa.Column('added_on', sa.Date(), nullable=True))
+        op.alter_column(table, 'added_on', server_default=sa.text('CURRENT_DATE'))
+
+
+def downgrade():
+    for table in ('user_meals', 'user_exercises', 'meal_comments', 'exercise_comments'):
+        op.drop_column(table, 'added_on')
@@ -3,10 +3,16 @@
 from datetime import datetime
 
 from flask_bcrypt import Bcrypt
-from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import selectinload
+
+from replicas import RoutingSQLAlchemy
+from sanitize import clean_description
 
 bcrypt = Bcrypt()
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
+migrate = Migrate()
 
 class User(db.Model):
     """User model."""
@@ -22,13 +28,15 @@ class User(db.Model):
     last_name = db.Column(db.String(30), nullable=False)
     img_url = db.Column(db.Text, default="/static/images/default-pic.png")
 
-    exercise_comments = db.relationship("ExerciseComment", backref="user", cascade="all,delete")
+    # The foreign keys delete these with the user (ON DELETE CASCADE), so deleting a
+    # user doesn't load them first.
+    exercise_comments = db.relationship("ExerciseComment", backref="user", cascade="all,delete", passive_deletes=True)
 
-    meal_comments = db.relationship("MealComment", backref="user", cascade="all,delete")
+    meal_comments = db.relationship("MealComment", backref="user", cascade="all,delete", passive_deletes=True)
 
-    user_exercises = db.relationship("UserExercise", backref="user", cascade="all, delete") 
+    user_exercises = db.relationship("UserExercise", backref="user", cascade="all, delete", passive_deletes=True)
 
-    user_meals = db.relationship("UserMeal", backref="user", cascade="all,delete")
+    user_meals = db.relationship("UserMeal", backref="user", cascade="all,delete", passive_deletes=True)
 
     @classmethod
     def register(cls, username, password, email, first_name, last_name, img_url):
@@ -54,13 +62,41 @@ class User(db.Model):
 
         user = cls.query.filter_by(username=username).first()
 
-        if user:
-            is_auth = bcrypt.check_password_hash(user.password, password)
-            if is_auth:
-                return user
+        if user and user.check_password(password):
+            return user
 
         return False
+
+    def check_password(self, password):
+        """Return True if `password` is this user's password."""
+
+        return bcrypt.check_password_hash(self.password, password)
     
+    @classmethod
+    def remove(cls, user_id):
+        """Delete a user with one DELETE statement. Returns True if a user was deleted.
+
+        The database deletes their comments and favorites along with them.
+        """
+
+        return cls.query.filter_by(id=user_id).delete(synchronize_session=False) == 1
+
+    @classmethod
+    def get_dashboard(cls, user_id):
+        """Return the user with their favorites and comments already loaded, or None.
+
+        Each collection is loaded with one extra SELECT (together with the exercise and
+        category it points to), so the dashboard runs the same five queries however many
+        favorites and comments the user has.
+        """
+
+        return cls.query.options(
+            selectinload(cls.user_exercises).joinedload(UserExercise.exercise).joinedload(Exercise.category),
+            selectinload(cls.user_meals),
+            selectinload(cls.exercise_comments).joinedload(ExerciseComment.exercise),
+            selectinload(cls.meal_comments),
+        ).filter_by(id=user_id).first()
+
     @classmethod
     def change_password(cls, id, current_password, new_password):
 
@@ -97,10 +133,31 @@ class Exercise(db.Model):
     id = db.Column(db.Integer, unique=True, nullable=False, primary_key=True)
     name = db.Column(db.Text, nullable=False)
     description = db.Column(db.Text)
-    category_id = db.Column(db.ForeignKey("exercise_categories.id", ondelete="CASCADE"), nullable=False)
+    # Sanitized and plain-text versions of the raw wger description, built at ingest time.
+    description_html = db.Column(db.Text)
+    description_text = db.Column(db.Text)
+    category_id = db.Column(db.ForeignKey("exercise_categories.id", ondelete="CASCADE"), nullable=False, index=True)
 
     category = db.relationship('ExerciseCategory', backref='exercise')
 
+    image = db.relationship('ExerciseImage', uselist=False, backref='exercise', cascade="all, delete-orphan")
+
+    def set_description(self, raw):
+        """Store the raw wger description along with its sanitized HTML and text versions."""
+
+        self.description = raw
+        self.description_html, self.description_text = clean_description(raw)
+
+class ExerciseImage(db.Model):
+    """Image URL resolved for an exercise by the image search API."""
+
+    __tablename__ = "exercise_images"
+
+    exercise_id = db.Column(db.ForeignKey("exercises.id", ondelete="CASCADE"), primary_key=True)
+    # Null when the search came back empty, so we know not to retry until the next refresh.
+    url = db.Column(db.Text)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
 class MealCategory(db.Model):
     __tablename__ = "meal_categories"
 
@@ -109,27 +166,190 @@ class MealCategory(db.Model):
     description = db.Column(db.Text, nullable=False)
     image_url = db.Column(db.Text, nullable=False)
 
+class Meal(db.Model):
+    """Local copy of a TheMealDB recipe."""
+
+    __tablename__ = "meals"
+
+    id = db.Column(db.Integer, unique=True, nullable=False, primary_key=True)
+    name = db.Column(db.Text, nullable=False)
+    category_id = db.Column(db.ForeignKey("meal_categories.id", ondelete="CASCADE"), nullable=False, index=True)
+    area = db.Column(db.Text)
+    instructions = db.Column(db.Text)
+    thumbnail_url = db.Column(db.Text)
+    youtube_url = db.Column(db.Text)
+    tags = db.Column(db.Text)
+
+    category = db.relationship('MealCategory', backref='meals')
+
+    ingredients = db.relationship("MealIngredient", backref="meal", order_by="MealIngredient.position", cascade="all, delete-orphan")
+
+    @property
+    def youtube_embed_url(self):
+        """YouTube only allows embedding through /embed/ links, not the watch links the API returns."""
+
+        if not self.youtube_url:
+            return None
+
+        return self.youtube_url.replace("watch?v=", "embed/")
+
+    @staticmethod
+    def columns_from_api(data, category_id):
+        """Return the meals table columns for a TheMealDB meal record as a dict."""
+
+        return {
+            'id': int(data['idMeal']),
+            'name': data['strMeal'],
+            'category_id': category_id,
+            'area': data.get('strArea'),
+            'instructions': data.get('strInstructions'),
+            'thumbnail_url': data.get('strMealThumb'),
+            'youtube_url': data.get('strYoutube') or None,
+            'tags': data.get('strTags'),
+        }
+
+    @staticmethod
+    def ingredients_from_api(data):
+        """Return the meal_ingredients columns for a TheMealDB meal record as a list of dicts."""
+
+        meal_id = int(data['idMeal'])
+
+        # The API returns ingredients as strIngredient1..20 / strMeasure1..20, stop at the first empty one.
+        ingredients = []
+
+        for i in range(1, 21):
+            ingredient = (data.get(f'strIngredient{i}') or '').strip()
+
+            if not ingredient:
+                break
+
+            measure = (data.get(f'strMeasure{i}') or '').strip()
+
+            ingredients.append({'meal_id': meal_id, 'position': i, 'ingredient': ingredient, 'measure': measure})
+
+        return ingredients
+
+    def update_from_api(self, data, category_id):
+        """Copy fields from a TheMealDB meal record onto this meal, replacing its ingredients."""
+
+        for column, value in self.columns_from_api(data, category_id).items():
+            setattr(self, column, value)
+
+        self.ingredients = [MealIngredient(position=row['position'], ingredient=row['ingredient'], measure=row['measure']) for row in self.ingredients_from_api(data)]
+
+class MealIngredient(db.Model):
+    """An ingredient and its measure for a meal."""
+
+    __tablename__ = "meal_ingredients"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    meal_id = db.Column(db.ForeignKey("meals.id", ondelete="CASCADE"), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False)
+    ingredient = db.Column(db.Text, nullable=False)
+    measure = db.Column(db.Text)
+
+class SyncState(db.Model):
+    """What the catalog sync last saw for one upstream resource.
+
+    `source` is the resource URL (with its query string). The special "catalog" row
+    records when a full sync last ran.
+    """
+
+    __tablename__ = "sync_state"
+
+    source = db.Column(db.Text, primary_key=True)
+    etag = db.Column(db.Text)
+    last_modified = db.Column(db.Text)
+    # sha256 of the last response body we processed.
+    content_hash = db.Column(db.String(64))
+    # For paginated resources, the page that followed this one.
+    next_url = db.Column(db.Text)
+    last_run_at = db.Column(db.DateTime)
+    last_changed_at = db.Column(db.DateTime)
+
 class UserExercise(db.Model):
     """Model for users' exercises."""
 
     __tablename__ = "user_exercises"
 
+    # Each user can favorite an exercise once. The constraint's index also covers lookups by user alone.
+    __table_args__ = (db.UniqueConstraint("user_id", "exercise_id", name="user_exercises_user_id_exercise_id_key"),)
+
     id = id = db.Column(db.Integer, unique=True, nullable=False, primary_key=True, auto_increment=True)
     user_id = db.Column(db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    exercise_id = db.Column(db.ForeignKey("exercises.id", ondelete="CASCADE"), unique=True, nullable=False)
+    exercise_id = db.Column(db.ForeignKey("exercises.id", ondelete="CASCADE"), nullable=False, index=True)
+    # The day this was added, which is the activity row it counted towards. Null for
+    # rows from before that was recorded.
+    added_on = db.Column(db.Date, server_default=db.func.current_date())
 
     exercise = db.relationship("Exercise") 
 
+    @classmethod
+    def add(cls, user_id, exercise_id):
+        """Favorite an exercise for a user. Does nothing if it's already a favorite.
+
+        Returns True if a favorite was added.
+        """
+
+        stmt = insert(cls.__table__).values(user_id=user_id, exercise_id=exercise_id).on_conflict_do_nothing(
+            index_elements=["user_id", "exercise_id"],
+        )
+
+        return db.session.execute(stmt).rowcount == 1
+
+    @classmethod
+    def remove(cls, user_id, exercise_id):
+        """Unfavorite an exercise for a user.
+
+        Returns the removed favorite's `added_on` in a row, or None if there was no favorite.
+        """
+
+        stmt = cls.__table__.delete().where(cls.user_id == user_id).where(cls.exercise_id == exercise_id).returning(cls.added_on)
+
+        return db.session.execute(stmt).first()
+
 class UserMeal(db.Model):
     """Model for users' meals."""
 
     __tablename__ = "user_meals"
 
+    # Each user can favorite a meal once. The constraint's index also covers lookups by user alone.
+    __table_args__ = (db.UniqueConstraint("user_id", "meal_id", name="user_meals_user_id_meal_id_key"),)
+
     id = id = db.Column(db.Integer, unique=True, nullable=False, primary_key=True, auto_increment=True)
     user_id = db.Column(db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    meal_id = db.Column(db.Integer, unique=True, nullable=False)
-    meal_name = db.Column(db.Text, unique=True, nullable=False)
+    meal_id = db.Column(db.Integer, nullable=False, index=True)
+    meal_name = db.Column(db.Text, nullable=False)
     meal_category = db.Column(db.Integer, nullable=False)
+    # The day this was added, see UserExercise.added_on.
+    added_on = db.Column(db.Date, server_default=db.func.current_date())
+
+    @classmethod
+    def add(cls, user_id, meal):
+        """Favorite a Meal for a user. Does nothing if it's already a favorite.
+
+        Returns True if a favorite was added.
+        """
+
+        stmt = insert(cls.__table__).values(
+            user_id=user_id,
+            meal_id=meal.id,
+            meal_name=meal.name,
+            meal_category=meal.category_id,
+        ).on_conflict_do_nothing(index_elements=["user_id", "meal_id"])
+
+        return db.session.execute(stmt).rowcount == 1
+
+    @classmethod
+    def remove(cls, user_id, meal_id):
+        """Unfavorite a meal for a user.
+
+        Returns the removed favorite's `added_on` in a row, or None if there was no favorite.
+        """
+
+        stmt = cls.__table__.delete().where(cls.user_id == user_id).where(cls.meal_id == meal_id).returning(cls.added_on)
+
+        return db.session.execute(stmt).first()
 
 class ExerciseComment(db.Model):
     """Comment model for exercises."""
@@ -138,8 +358,10 @@ class ExerciseComment(db.Model):
 
     id = id = db.Column(db.Integer, primary_key=True, auto_increment=True)
     content = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    exercise_id = db.Column(db.ForeignKey("exercises.id", ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    exercise_id = db.Column(db.ForeignKey("exercises.id", ondelete="CASCADE"), nullable=False, index=True)
+    # The day this was added, see UserExercise.added_on.
+    added_on = db.Column(db.Date, server_default=db.func.current_date())
 
     exercise = db.relationship("Exercise")
 
@@ -150,10 +372,66 @@ class MealComment(db.Model):
 
     id = id = db.Column(db.Integer, unique=True, nullable=False, primary_key=True, auto_increment=True)
     content = db.Column(db.Text, nullable=False)
-    user_id = db.Column(db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    meal_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    meal_id = db.Column(db.Integer, nullable=False, index=True)
     meal_name = db.Column(db.Text, nullable=False)
     meal_category = db.Column(db.Integer, nullable=False)
+    # The day this was added, see UserExercise.added_on.
+    added_on = db.Column(db.Date, server_default=db.func.current_date())
+
+class ExerciseCounter(db.Model):
+    """Number of comments and favorites on an exercise, kept up to date by counters.bump()."""
+
+    __tablename__ = "exercise_counters"
+
+    exercise_id = db.Column(db.ForeignKey("exercises.id", ondelete="CASCADE"), primary_key=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+class MealCounter(db.Model):
+    """Number of comments and favorites on a meal, kept up to date by counters.bump()."""
+
+    __tablename__ = "meal_counters"
+
+    # Not a foreign key, like meal_comments.meal_id and user_meals.meal_id.
+    meal_id = db.Column(db.Integer, primary_key=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+class ExerciseActivity(db.Model):
+    """Comments and favorites added to an exercise on one day and not removed since, kept by counters.bump()."""
+
+    __tablename__ = "exercise_activity"
+
+    exercise_id = db.Column(db.ForeignKey("exercises.id", ondelete="CASCADE"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+class MealActivity(db.Model):
+    """Comments and favorites added to a meal on one day and not removed since, kept by counters.bump()."""
+
+    __tablename__ = "meal_activity"
+
+    meal_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True, index=True)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    favorite_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+class LeaderboardEntry(db.Model):
+    """One place on a precomputed leaderboard, rebuilt by leaderboards.refresh()."""
+
+    __tablename__ = "leaderboard_entries"
+
+    # e.g. "exercises-favorited" or "meals-discussed".
+    board = db.Column(db.Text, primary_key=True)
+    # 0 for the board across all categories.
+    category_id = db.Column(db.Integer, primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True)
+    item_id = db.Column(db.Integer, nullable=False)
+    item_category_id = db.Column(db.Integer, nullable=False)
+    name = db.Column(db.Text, nullable=False)
+    score = db.Column(db.Integer, nullable=False)
 
 def connect_db(app):
     """Connect this database to provided Flask app.
@@ -163,3 +441,4 @@ def connect_db(app):
 
     db.app = app
     db.init_app(app)
+    migrate.init_app(app, db)
@@ -0,0 +1,114 @@
+"""Guardian news feed for the homepage (https://open-platform.theguardian.com/)."""
+
+import logging
+import os
+import threading
+import time
+from functools import partial
+
+import http_client
+
+logger = logging.getLogger(__name__)
+
+SEARCH_URL = "https://content.guardianapis.com/search"
+
+API_KEY = os.environ.get("GUARDIAN_API_KEY", "67145bff-c60a-4155-a395-30810db46f1f")
+
+# Result sets shown on the homepage, keyed by the name the view asks for.
+QUERIES = {
+    "health": '"healthy eating"',
+    "exercise": '"exercising"',
+}
+
+
+class NewsFeed:
+    """Holds the latest Guardian results in memory and refreshes them in the background.
+
+    Readers get whatever is cached, even if it's stale. A daemon thread re-fetches
+    every `interval` seconds; if the Guardian is down, the old results are kept until a
+    refresh succeeds. Only the first readers in a process wait, for at most
+    `first_wait` seconds, so a fresh worker doesn't show an empty feed.
+
+    `last_refresh` is when every query last came back successfully.
+    """
+
+    def __init__(self, queries=QUERIES, interval=900, api_key=API_KEY, first_wait=3):
+        self.queries = queries
+        self.interval = interval
+        self.api_key = api_key
+        self.first_wait = first_wait
+        self.results = {name: [] for name in queries}
+        self.last_refresh = None
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._first_refresh = threading.Event()
+
+    def get(self, name):
+        """Return the cached results for `name`, waiting briefly only for this process's first refresh."""
+
+        self.start()
+
+        self._first_refresh.wait(self.first_wait)
+
+        return self.results.get(name, [])
+
+    def start(self):
+        """Start the refresh thread for this process if it isn't running yet.
+
+        Tracks the pid so a worker forked after the thread was started gets its own.
+        """
+
+        if self._thread is not None and self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+
+            self._pid = os.getpid()
+            self._first_refresh = threading.Event()
+            self._thread = threading.Thread(target=self._run, name="news-feed-refresh", daemon=True)
+            self._thread.start()
+
+    def search(self, query):
+        """Return the Guardian's results for `query`."""
+
+        return http_client.get_json("guardian", SEARCH_URL, params={"q": query, "api-key": self.api_key})["response"]["results"]
+
+    def refresh(self):
+        """Fetch every query at once and swap in the new results that came back."""
+
+        calls = {name: partial(self.search, query) for name, query in self.queries.items()}
+
+        failed = False
+
+        for name, results in http_client.fan_out(calls).items():
+            if isinstance(results, Exception):
+                # Keep serving what we have.
+                logger.warning("Guardian refresh for %r failed: %r", name, results)
+                self.last_error = repr(results)
+                failed = True
+                continue
+
+            self.results[name] = results
+
+        if not failed:
+            self.last_refresh = time.time()
+            self.last_error = None
+
+    def _run(self):
+        first_refresh = self._first_refresh
+
+        while True:
+            try:
+                self.refresh()
+            finally:
+                # Waiting readers go ahead with whatever we have, even if this failed.
+                first_refresh.set()
+
+            time.sleep(self.interval)
+
+
+news_feed = NewsFeed()
@@ -0,0 +1,130 @@
+"""Send database reads from GET requests to a read replica.
+
+Replicas are listed in the SQLALCHEMY_REPLICA_URIS setting; with none configured
+everything goes to the primary as before. A request's session uses a replica only
+while all of these hold:
+
+  - the request is a GET or HEAD;
+  - the session hasn't written anything yet. After the first flush or INSERT / UPDATE /
+    DELETE, it stays on the primary so the request reads its own writes;
+  - the client hasn't made a write request in the last REPLICA_STICKY_SECONDS. That
+    covers the redirect after a form POST, which must see what the POST wrote even if
+    the replica is lagging.
+
+Background threads and CLI commands always use the primary.
+
+RoutingSQLAlchemy also gives every engine the pool settings from db_pool.
+"""
+
+import random
+import time
+
+from flask import current_app, has_request_context, request, session
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import event, orm
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.selectable import Selectable
+
+import db_pool
+
+READ_METHODS = {"GET", "HEAD"}
+
+# Bind keys the replica engines are registered under in SQLALCHEMY_BINDS.
+BIND_PREFIX = "replica-"
+
+
+def replica_binds(app):
+    """Return the bind keys of `app`'s replicas."""
+
+    return [key for key in app.config.get('SQLALCHEMY_BINDS') or {} if key.startswith(BIND_PREFIX)]
+
+
+def replica_allowed():
+    """Return True if the current request's reads may go to a replica."""
+
+    if not has_request_context() or request.method not in READ_METHODS:
+        return False
+
+    return session.get('primary_until', 0) < time.time()
+
+
+class RoutingSession(SignallingSession):
+    """Session that reads from a replica when replica_allowed() and it hasn't written yet."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Set on the first write; the rest of the session then reads from the primary.
+        self.use_primary = False
+        self.replica_bind = None
+
+    def get_bind(self, mapper=None, clause=None):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.use_primary = True
+
+        # Plain SQL text could be a write, so only SELECTs (or ORM loads) are candidates.
+        is_read = clause is None or isinstance(clause, Selectable)
+
+        if self.use_primary or not is_read or not replica_allowed():
+            return super().get_bind(mapper, clause)
+
+        binds = replica_binds(self.app)
+
+        if not binds:
+            return super().get_bind(mapper, clause)
+
+        # Stick to one replica for the whole request.
+        if self.replica_bind is None:
+            self.replica_bind = random.choice(binds)
+
+        return get_state(self.app).db.get_engine(self.app, bind=self.replica_bind)
+
+
+event.listen(RoutingSession, "after_begin", db_pool.set_local_statement_timeout)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy with RoutingSession, replica engines from SQLALCHEMY_REPLICA_URIS
+    and the connection pool settings from db_pool."""
+
+    def init_app(self, app):
+        # Check the pool settings now rather than on the first query.
+        db_pool.engine_options(app.config)
+
+        binds = dict(app.config.get('SQLALCHEMY_BINDS') or {})
+
+        for i, uri in enumerate(app.config.get('SQLALCHEMY_REPLICA_URIS') or []):
+            binds[f"{BIND_PREFIX}{i}"] = uri
+
+        app.config['SQLALCHEMY_BINDS'] = binds or None
+
+        super().init_app(app)
+
+        app.after_request(remember_write)
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        super().apply_driver_hacks(app, sa_url, options)
+
+        # Explicit SQLALCHEMY_ENGINE_OPTIONS still win over these.
+        options.update(db_pool.engine_options(app.config))
+
+    def pool_stats(self, app=None):
+        """Return pool stats for the primary and every replica, keyed by bind."""
+
+        app = self.get_app(app)
+
+        binds = [None] + replica_binds(app)
+
+        return {bind or "primary": db_pool.stats(self.get_engine(app, bind=bind)) for bind in binds}
+
+
+def remember_write(response):
+    """After a write request, keep this client's reads on the primary for a little while."""
+
+    if request.method not in READ_METHODS and replica_binds(current_app):
+        session['primary_until'] = time.time() + current_app.config['REPLICA_STICKY_SECONDS']
+
+    return response
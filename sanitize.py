@@ -0,0 +1,58 @@
+"""Clean up HTML that comes from upstream APIs before we store it."""
+
+from bs4 import BeautifulSoup
+from bs4.element import PreformattedString
+
+# Tags we keep in exercise descriptions. Everything else is unwrapped to its text.
+ALLOWED_TAGS = {"p", "ol", "ul", "li", "strong", "em", "b", "i", "br"}
+
+# Tags whose content is never shown.
+DROPPED_TAGS = {"script", "style", "iframe", "object", "embed"}
+
+# Tags that start a new line in the plain-text version.
+BLOCK_TAGS = {"p", "li", "br", "ol", "ul"}
+
+
+def clean_html(raw):
+    """Return `raw` with only allowed, attribute-free tags left."""
+
+    soup = BeautifulSoup(raw or "", "html.parser")
+
+    # Drop these first, so the loop below never reaches a tag inside one that's already gone.
+    for tag in soup.find_all(DROPPED_TAGS):
+        tag.decompose()
+
+    # Comments, CDATA, processing instructions, declarations and doctypes are written
+    # back out verbatim, so anything hidden in them would reach the page unescaped.
+    for node in soup.find_all(string=lambda string: isinstance(string, PreformattedString)):
+        node.extract()
+
+    for tag in soup.find_all(True):
+        if tag.name in ALLOWED_TAGS:
+            tag.attrs = {}
+        else:
+            tag.unwrap()
+
+    return str(soup).strip()
+
+
+def html_to_text(html):
+    """Return the text of `html` with one line per paragraph or list item."""
+
+    soup = BeautifulSoup(html or "", "html.parser")
+
+    for tag in soup.find_all(BLOCK_TAGS):
+        tag.insert_before("\n")
+        tag.insert_after("\n")
+
+    lines = (" ".join(line.split()) for line in soup.get_text().splitlines())
+
+    return "\n".join(line for line in lines if line)
+
+
+def clean_description(raw):
+    """Return the sanitized HTML and plain-text versions of an upstream description."""
+
+    html = clean_html(raw)
+
+    return html, html_to_text(html)
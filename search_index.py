@@ -0,0 +1,161 @@
+"""In-process full-text index over our local copy of the meal catalog."""
+
+import bisect
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import Meal
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# How much a match in each field counts towards a meal's score.
+FIELD_WEIGHTS = {
+    "name": 4.0,
+    "category": 2.0,
+    "area": 2.0,
+    "ingredients": 1.0,
+}
+
+# Matching only the start of a word is worth less than matching the whole word.
+PREFIX_FACTOR = 0.5
+
+
+def tokenize(text):
+    """Split `text` into lowercase alphanumeric words."""
+
+    return TOKEN_RE.findall((text or "").lower())
+
+
+class MealSearchIndex:
+    """Inverted index from words to the meals they appear in.
+
+    Built from the meals table on first use and rebuilt when it's older than
+    `max_age` seconds or after `invalidate()` (called by the meal sync), so each
+    worker keeps its own copy without having to query the database per search.
+    """
+
+    def __init__(self, max_age=600):
+        self.max_age = max_age
+        self.built_at = None
+        self._postings = {}
+        self._tokens = []
+        self._meals = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Mark the index as stale so the next search rebuilds it."""
+
+        self.built_at = None
+
+    def build(self):
+        """Rebuild the index from the meals table."""
+
+        meals = Meal.query.options(joinedload(Meal.category), selectinload(Meal.ingredients)).all()
+
+        postings = defaultdict(lambda: defaultdict(float))
+        documents = {}
+
+        for meal in meals:
+            fields = {
+                "name": meal.name,
+                "category": meal.category.name,
+                "area": meal.area,
+                "ingredients": " ".join(ingredient.ingredient for ingredient in meal.ingredients),
+            }
+
+            for field, text in fields.items():
+                for token in tokenize(text):
+                    postings[token][meal.id] += FIELD_WEIGHTS[field]
+
+            documents[meal.id] = {
+                "id": meal.id,
+                "name": meal.name,
+                "thumbnail_url": meal.thumbnail_url,
+                "category": meal.category.name,
+                "category_id": meal.category_id,
+                "area": meal.area,
+            }
+
+        # Swap everything in at once so concurrent searches never see a half-built index.
+        self._postings = {token: dict(scores) for token, scores in postings.items()}
+        self._tokens = sorted(self._postings)
+        self._meals = documents
+        self.built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """Rebuild the index if it has never been built or has gone stale."""
+
+        if self.built_at is not None and time.monotonic() - self.built_at < self.max_age:
+            return
+
+        with self._lock:
+            if self.built_at is None or time.monotonic() - self.built_at >= self.max_age:
+                self.build()
+
+    def _term_scores(self, term):
+        """Score meals for one search term, counting whole-word and prefix matches."""
+
+        scores = defaultdict(float)
+
+        postings = self._postings
+        tokens = self._tokens
+
+        for meal_id, weight in postings.get(term, {}).items():
+            scores[meal_id] += weight
+
+        # Every word starting with `term` sits right after it in the sorted token list.
+        i = bisect.bisect_right(tokens, term)
+
+        while i < len(tokens) and tokens[i].startswith(term):
+            for meal_id, weight in postings[tokens[i]].items():
+                scores[meal_id] += weight * PREFIX_FACTOR
+            i += 1
+
+        return scores
+
+    def search(self, query, limit=20):
+        """Return up to `limit` meals matching every word in `query`, best matches first."""
+
+        self.ensure_fresh()
+
+        terms = tokenize(query)
+
+        if not terms:
+            return []
+
+        totals = None
+
+        for term in terms:
+            scores = self._term_scores(term)
+
+            if totals is None:
+                totals = scores
+            else:
+                totals = {meal_id: totals[meal_id] + score for meal_id, score in scores.items() if meal_id in totals}
+
+            if not totals:
+                return []
+
+        ranked = sorted(totals.items(), key=lambda item: (-item[1], self._meals[item[0]]["name"]))
+
+        return [dict(self._meals[meal_id], score=score) for meal_id, score in ranked[:limit]]
+
+    def random_meal(self):
+        """Return a random meal from the index, or None if there are no meals."""
+
+        self.ensure_fresh()
+
+        meals = self._meals
+
+        if not meals:
+            return None
+
+        return meals[random.choice(list(meals))]
+
+
+meal_index = MealSearchIndex()
@@ -0,0 +1,24 @@
+// Select comment list element
+commentList = document.getElementById('comment-list');
+
+// The newest comments are rendered by the server. This button loads older ones one page at a time.
+loadMoreCommentsBtn = document.getElementById('load-more-comments-btn');
+
+// Get the comments older than the last one shown and append them to the comment list
+async function loadMoreComments() {
+  const before = loadMoreCommentsBtn.dataset.before;
+
+  res = await axios.get(loadMoreCommentsBtn.dataset.url, { params: { before } });
+
+  commentList.insertAdjacentHTML('beforeend', res.data.html);
+
+  if (res.data.next_before) {
+    loadMoreCommentsBtn.dataset.before = res.data.next_before;
+  } else {
+    loadMoreCommentsBtn.remove();
+  }
+}
+
+if (loadMoreCommentsBtn) {
+  loadMoreCommentsBtn.addEventListener('click', loadMoreComments);
+}
@@ -4,57 +4,35 @@ const search = document.getElementById('search'),
   random = document.getElementById('random'),
   mealsEl = document.getElementById('meals'),
   resultHeading = document.getElementById('result-heading'),
-  mealSearchError = document.getElementById('meal-search-error'),
-  single_mealEl = document.getElementById('single-meal');
+  mealSearchError = document.getElementById('meal-search-error');
 
-// API's random meal endpoint doesn't return the category id of the meal. I'm storing the meal category id's in an object here to later get the corresponding meal category id. It's a little tedious but it's the simplest and easiest way to get them on this page.
-const mealCategories = {
-  "Beef": "1",
-  "Chicken": "2",
-  "Dessert": "3",
-  "Lamb": "4",
-  "Miscellaneous": "5",
-  "Pasta": "6",
-  "Pork": "7",
-  "Seafood": "8",
-  "Side": "9",
-  "Starter": "10",
-  "Vegan": "11",
-  "Vegetarian": "12",
-  "Breakfast": "13",
-  "Goat": "14"
-}
-
-// Search meal and fetch from API
+// Search our local meal index
 function searchMeal(e) {
   e.preventDefault();
 
-  // Clear single meal
-  single_mealEl.innerHTML = '';
-
   // Get search term
   const term = search.value;
 
   // Check if search term is empty, if so display warning to user.
   if (term.trim()) {
-    fetch(`https://www.themealdb.com/api/json/v1/1/search.php?s=${term}`)
+    fetch(`/meals/search?q=${encodeURIComponent(term)}`)
       .then(res => res.json())
       .then(data => {
-        console.log(data);
         resultHeading.innerHTML = `<h2 class="mt-4">Search results for '${term}':</h2>`;
 
-        if (data.meals === null) {
+        if (data.meals.length === 0) {
+          mealsEl.innerHTML = '';
           resultHeading.innerHTML = `<p>There are no search results. Try again!<p>`;
         } else {
           mealsEl.innerHTML = data.meals
             .map(
               meal => `
-            <div class="meal">
-              <img src="${meal.strMealThumb}" alt="${meal.strMeal}" />
-              <div class="meal-info" data-mealID="${meal.idMeal}">
-                <h3>${meal.strMeal}</h3>
+            <a class="meal" href="/meals/${meal.category_id}/${meal.id}">
+              <img src="${meal.thumbnail_url}" alt="${meal.name}" />
+              <div class="meal-info">
+                <h3>${meal.name}</h3>
               </div>
-            </div>
+            </a>
           `
             )
             .join('');
@@ -68,84 +46,11 @@ function searchMeal(e) {
 }
 
 
-// Fetch meal by ID
-function getMealById(mealID) {
-  fetch(`https://www.themealdb.com/api/json/v1/1/lookup.php?i=${mealID}`)
-    .then(res => res.json())
-    .then(data => {
-      const meal = data.meals[0];
-
-      addMealToDOM(meal);
-    });
-}
-
-// Fetch random meal from API
+// Go to a random meal from our local copy of TheMealDB
 function getRandomMeal() {
-  // Clear meals and heading
-  mealsEl.innerHTML = '';
-  resultHeading.innerHTML = '';
-
-  fetch(`https://www.themealdb.com/api/json/v1/1/random.php`)
-    .then(res => res.json())
-    .then(data => {
-      const meal = data.meals[0];
-
-      addMealToDOM(meal);
-    });
-}
-
-// Add meal to DOM
-function addMealToDOM(meal) {
-  const ingredients = [];
-
-  for (let i = 1; i <= 20; i++) {
-    if (meal[`strIngredient${i}`]) {
-      ingredients.push(
-        `${meal[`strIngredient${i}`]} - ${meal[`strMeasure${i}`]}`
-      );
-    } else {
-      break;
-    }
-  }
-
-  console.log(mealCategories[meal.strCategory])
-
-  single_mealEl.innerHTML = `
-    <div class="single-meal">
-      <h1>${meal.strMeal}</h1>
-      <img src="${meal.strMealThumb}" alt="${meal.strMeal}" />
-      <div class="single-meal-info">
-        ${meal.strCategory ? `<p>${meal.strCategory}</p>` : ''}
-        ${meal.strArea ? `<p>${meal.strArea}</p>` : ''}
-      </div>
-      <div class="main">
-        <p>${meal.strInstructions}</p>
-        <h2>Ingredients</h2>
-        <ul>
-          ${ingredients.map(ing => `<li>${ing}</li>`).join('')}
-        </ul>
-      </div>
-    </div>
-    
-    <a class="btn btn-info mb-5" href="/meals/${mealCategories[meal.strCategory]}/${meal.idMeal}">View Meal Page</a>
-    `
+  window.location = '/meals/random';
 }
 
 // Event listeners
 submit.addEventListener('submit', searchMeal);
 random.addEventListener('click', getRandomMeal);
-
-mealsEl.addEventListener('click', e => {
-  const mealInfo = e.path.find(item => {
-    if (item.classList) {
-      return item.classList.contains('meal-info');
-    } else {
-      return false;
-    }
-  });
-
-  if (mealInfo) {
-    const mealID = mealInfo.getAttribute('data-mealid');
-    getMealById(mealID);
-  }
-});
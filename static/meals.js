@@ -1,9 +1,11 @@
 // Select meal container element
 mealContainer = document.getElementById('meal-container');
 
-// Meal category name and meal category id are stored on the h1 for easy access. Get those values from there.
+// The first page of meals is rendered by the server. This button loads the rest one page at a time.
+loadMoreBtn = document.getElementById('load-more-btn');
+
+// Meal category id is stored on the h1 for easy access. Get it from there.
 h1 = document.querySelector('h1');
-meal_category = h1.id;
 meal_category_id = h1.dataset.id;
 
 // Helper function for generating HTML markup
@@ -11,33 +13,32 @@ function generateHTML(meal) {
   return `
       <div class="col-12">
         <div class="d-flex justify-content-center">
-          <h3 class="mb-3"><a class="meal-titles" href="/meals/${meal_category_id}/${meal.idMeal}">${meal.strMeal}</a></h3>
+          <h3 class="mb-3"><a class="meal-titles" href="/meals/${meal_category_id}/${meal.id}">${meal.name}</a></h3>
         </div>
         <div class="d-flex justify-content-center">
-          <a class="meal-titles" href="/meals/${meal_category_id}/${meal.idMeal}">
-          <img class="meal-category-img mb-5 img-thumbnail" src="${meal.strMealThumb}" alt="${meal.strMeal} image">
+          <a class="meal-titles" href="/meals/${meal_category_id}/${meal.id}">
+          <img class="meal-category-img mb-5 img-thumbnail" src="${meal.thumbnail_url}" alt="${meal.name} image" loading="lazy">
           </a>
-          
         </div>
       </div>
   `;
 }
 
-// Send API request and display each meal in meal container element
-async function getMealsByCategory() {
-  res = await axios.get(`https://www.themealdb.com/api/json/v1/1/filter.php?c=${meal_category}`);
-   
-  meals = res.data.meals
-
-  for (meal of meals) {
-    let mealDiv = document.createElement('div');
-    mealDiv.innerHTML = generateHTML(meal);
-    mealContainer.append(mealDiv);
-  }
-}
+// Get the next page of meals from our server and append them to the meal container in one go
+async function loadMoreMeals() {
+  const page = loadMoreBtn.dataset.nextPage;
 
+  res = await axios.get(`/meals/${meal_category_id}/list`, { params: { page } });
 
-// On Load
-getMealsByCategory();
+  mealContainer.insertAdjacentHTML('beforeend', res.data.meals.map(generateHTML).join(''));
 
+  if (res.data.has_next) {
+    loadMoreBtn.dataset.nextPage = res.data.page + 1;
+  } else {
+    loadMoreBtn.remove();
+  }
+}
 
+if (loadMoreBtn) {
+  loadMoreBtn.addEventListener('click', loadMoreMeals);
+}
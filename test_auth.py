@@ -0,0 +1,152 @@
+"""Current-user loader tests."""
+
+import os
+from unittest import TestCase
+
+from flask import session
+from sqlalchemy import event
+from werkzeug.exceptions import Unauthorized
+
+from models import db, User, Exercise, ExerciseCategory, UserExercise
+
+# Set an environmental variable to use a different database for tests
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+
+# Don't have WTForms use CSRF at all, since it's a pain to test
+app.config['WTF_CSRF_ENABLED'] = False
+from auth import login_user, logout_user, current_user, current_user_id, require_user, require_user_id
+
+db.create_all()
+
+class AuthTestCase(TestCase):
+    """Test loading the logged-in user from the session."""
+
+    def setUp(self):
+        """Add a user."""
+
+        db.drop_all()
+        db.create_all()
+
+        user = User.register("testing1", "password", "testing1@test.com", "John", "Doe", None)
+        user.id = 1111
+
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+
+        db.session.rollback()
+
+    def count_statements(self, fn):
+        """Return how many SQL statements `fn()` runs."""
+
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        event.listen(db.engine, "before_cursor_execute", count)
+
+        try:
+            fn()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+
+        return len(statements)
+
+    def test_login_stores_id(self):
+        """Does logging in store the user's id and username, and logging out clear them?"""
+
+        with app.test_request_context():
+            login_user(User.query.get(1111))
+
+            self.assertEqual(session["user_id"], 1111)
+            self.assertEqual(session["username"], "testing1")
+
+            logout_user()
+
+            self.assertIsNone(current_user())
+            self.assertIsNone(current_user_id())
+
+    def test_current_user_loaded_once(self):
+        """Is the user loaded by id once per request, and the id read without a query?"""
+
+        with app.test_request_context():
+            session["user_id"] = 1111
+            session["username"] = "testing1"
+            db.session.expunge_all()
+
+            self.assertEqual(self.count_statements(current_user_id), 0)
+            self.assertEqual(self.count_statements(lambda: (current_user(), current_user(), require_user("testing1"))), 1)
+            self.assertEqual(current_user().username, "testing1")
+
+    def test_username_only_session(self):
+        """Do sessions that only have the username still work, and gain the user id?"""
+
+        with app.test_request_context():
+            session["username"] = "testing1"
+
+            self.assertEqual(require_user_id("testing1"), 1111)
+            self.assertEqual(session["user_id"], 1111)
+
+    def test_require_user(self):
+        """Are anonymous users and other users' URLs rejected?"""
+
+        with app.test_request_context():
+            with self.assertRaises(Unauthorized):
+                require_user_id()
+
+            login_user(User.query.get(1111))
+
+            with self.assertRaises(Unauthorized):
+                require_user("someone-else")
+
+            with self.assertRaises(Unauthorized):
+                require_user_id("someone-else")
+
+            self.assertEqual(require_user_id("testing1"), 1111)
+
+    def test_deleted_user_session(self):
+        """Does writing with the session of a deleted user log them out with a 401?"""
+
+        db.session.add(ExerciseCategory(id=1, name="Arms"))
+        db.session.add(Exercise(id=1, name="Curl", category_id=1))
+        db.session.commit()
+
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess["user_id"] = 2222
+                sess["username"] = "deleted"
+
+            resp = client.post("/users/deleted/exercises/add", data={"data": 1})
+
+            self.assertEqual(resp.status_code, 401)
+            self.assertNotIn("user_id", session)
+
+            with client.session_transaction() as sess:
+                sess["user_id"] = 2222
+
+            resp = client.post("/exercises/1/1/comment", data={"content": "Nice"})
+
+            self.assertEqual(resp.status_code, 401)
+
+        self.assertEqual(UserExercise.query.count(), 0)
+
+    def test_missing_exercise(self):
+        """Is favoriting or commenting on an exercise that doesn't exist a 404, with the user kept logged in?"""
+
+        with app.test_client() as client:
+            with client.session_transaction() as sess:
+                sess["user_id"] = 1111
+                sess["username"] = "testing1"
+
+            resp = client.post("/users/testing1/exercises/add", data={"data": 404})
+
+            self.assertEqual(resp.status_code, 404)
+
+            resp = client.post("/exercises/1/404/comment", data={"content": "Nice"})
+
+            self.assertEqual(resp.status_code, 404)
+            self.assertEqual(session["user_id"], 1111)
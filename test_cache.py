@@ -0,0 +1,41 @@
+"""Cache tests."""
+
+import time
+from unittest import TestCase
+
+from cache import TTLCache
+
+class TTLCacheTestCase(TestCase):
+    """Test the TTL + LRU cache used by the API clients."""
+
+    def test_get_and_set(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set(1, "Beef and Mustard Pie")
+
+        self.assertEqual(cache.get(1), "Beef and Mustard Pie")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set(1, "a")
+        cache.set(2, "b")
+
+        # Touch 1 so that 2 becomes the least recently used entry.
+        cache.get(1)
+        cache.set(3, "c")
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get(1), "a")
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(cache.get(3), "c")
+
+    def test_ttl_expiry(self):
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set(1, "a", ttl=0.01)
+
+        time.sleep(0.02)
+
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats()["size"], 0)
@@ -0,0 +1,176 @@
+"""Catalog sync tests."""
+
+import json
+import os
+from unittest import TestCase
+from unittest.mock import patch
+
+from models import db, Exercise, ExerciseCategory, Meal, MealCategory, SyncState
+
+# Set an environmental variable to use a different database for tests 
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+import catalog
+
+db.create_all()
+
+class FakeResponse:
+    """Just enough of requests.Response for the catalog sync."""
+
+    def __init__(self, data, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = json.dumps(data).encode()
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+class FakeUpstream:
+    """Serve canned responses by URL and record the requests made."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    def __call__(self, upstream, url, params=None, headers=None):
+        self.requests.append((url, params, headers))
+
+        if headers and headers.get('If-None-Match') == 'v1':
+            return FakeResponse(None, status_code=304)
+
+        return FakeResponse(self.pages.get(url, {}), headers={'ETag': 'v1'} if 'etag' in url else {})
+
+EXERCISE_URL = "https://wger.de/api/v2/exercise/"
+EXERCISE_PAGE_2 = "https://wger.de/api/v2/exercise/?page=2"
+CATEGORY_URL = "https://wger.de/api/v2/exercisecategory/"
+
+PAGES = {
+    CATEGORY_URL: {"count": 2, "next": None, "results": [{"id": 10, "name": "Abs"}, {"id": 11, "name": "Arms"}]},
+    EXERCISE_URL: {"count": 3, "next": EXERCISE_PAGE_2, "results": [{"id": 91, "name": "Crunches", "description": "<p>Lie down</p>", "category": 10}]},
+    EXERCISE_PAGE_2: {"count": 3, "next": None, "results": [{"id": 92, "name": "Curls", "description": "Curl", "category": 11}, {"id": 93, "name": "Mystery", "description": "", "category": 99}]},
+}
+
+class CatalogSyncTestCase(TestCase):
+    """Test syncing upstream catalogs into the database."""
+
+    def setUp(self):
+        """Start every test with empty tables."""
+
+        db.drop_all()
+        db.create_all()
+
+    def tearDown(self):
+        """Tear down after tests are completed"""
+        res = super().tearDown()
+        db.session.rollback()
+        return res
+
+    def test_sync_exercises(self):
+        with patch("http_client.get", FakeUpstream(PAGES)):
+            self.assertEqual(catalog.sync_exercise_categories(), 2)
+            self.assertEqual(catalog.sync_exercises(), 2)
+
+        self.assertEqual(ExerciseCategory.query.count(), 2)
+        # The exercise with an unknown category is skipped.
+        self.assertEqual(Exercise.query.count(), 2)
+        self.assertEqual(Exercise.query.get(91).description_html, "<p>Lie down</p>")
+
+    def test_sync_updates_changed_rows_only(self):
+        pages = dict(PAGES)
+
+        with patch("http_client.get", FakeUpstream(pages)):
+            catalog.sync_exercise_categories()
+
+            # Same body as last time: nothing is processed.
+            self.assertEqual(catalog.sync_exercise_categories(), 0)
+
+            pages[CATEGORY_URL] = {"count": 2, "next": None, "results": [{"id": 10, "name": "Core"}, {"id": 11, "name": "Arms"}]}
+
+            # Only the renamed category is rewritten.
+            self.assertEqual(catalog.sync_exercise_categories(), 1)
+
+        self.assertEqual(ExerciseCategory.query.get(10).name, "Core")
+
+    def test_unchanged_pages_are_skipped(self):
+        with patch("http_client.get", FakeUpstream(PAGES)):
+            catalog.sync_exercise_categories()
+            catalog.sync_exercises()
+
+            # The second run still walks every page, via the stored next links, but writes nothing.
+            self.assertEqual(catalog.sync_exercises(), 0)
+            self.assertEqual(catalog.sync_exercises(force=True), 0)
+
+        self.assertEqual(SyncState.query.get(EXERCISE_URL + "?language=2&limit=100").next_url, EXERCISE_PAGE_2)
+
+    def test_skipped_rows_are_retried(self):
+        pages = dict(PAGES)
+
+        with patch("http_client.get", FakeUpstream(pages)):
+            catalog.sync_exercise_categories()
+            catalog.sync_exercises()
+
+            pages[CATEGORY_URL] = {"count": 3, "next": None, "results": [{"id": 10, "name": "Abs"}, {"id": 11, "name": "Arms"}, {"id": 99, "name": "Other"}]}
+            catalog.sync_exercise_categories()
+
+            # Page 2 is unchanged, but it had a row we skipped, so it's processed again.
+            self.assertEqual(catalog.sync_exercises(), 1)
+
+        self.assertEqual(Exercise.query.get(93).category_id, 99)
+
+    def test_sync_catalog_is_one_transaction(self):
+        def get(upstream, url, params=None, headers=None):
+            if upstream == "mealdb":
+                raise catalog.http_client.UpstreamError("TheMealDB is down")
+
+            return FakeResponse(PAGES.get(url, {}))
+
+        with patch("http_client.get", get):
+            with self.assertRaises(catalog.http_client.UpstreamError):
+                catalog.sync_catalog()
+
+        # The exercise categories synced before the failure weren't saved either.
+        self.assertEqual(ExerciseCategory.query.count(), 0)
+        self.assertEqual(SyncState.query.count(), 0)
+
+    def test_not_modified(self):
+        url = "https://www.themealdb.com/api/json/v1/1/etag"
+        upstream = FakeUpstream({url: {"meals": []}})
+
+        with patch("http_client.get", upstream):
+            data, state = catalog.fetch_if_changed("mealdb", url)
+            self.assertEqual(data, {"meals": []})
+
+            data, state = catalog.fetch_if_changed("mealdb", url)
+            self.assertIsNone(data)
+
+        self.assertEqual(upstream.requests[1][2], {"If-None-Match": "v1"})
+
+    def test_sync_meals(self):
+        c = MealCategory(id=1, name="Beef", description="Beef meals", image_url="img")
+        db.session.add(c)
+        db.session.commit()
+
+        search_url = "https://www.themealdb.com/api/json/v1/1/search.php"
+        meals = {"meals": [{"idMeal": "52874", "strMeal": "Beef and Mustard Pie", "strCategory": "Beef", "strIngredient1": "Beef", "strMeasure1": "1kg"}]}
+
+        def get(upstream, url, params=None, headers=None):
+            return FakeResponse(meals if params == {"f": "b"} else {"meals": None})
+
+        with patch("http_client.get", get):
+            self.assertEqual(catalog.sync_meals(), 1)
+            self.assertEqual(catalog.sync_meals(force=True), 0)
+
+        meal = Meal.query.get(52874)
+
+        self.assertEqual(meal.name, "Beef and Mustard Pie")
+        self.assertEqual([i.ingredient for i in meal.ingredients], ["Beef"])
+        self.assertIsNotNone(SyncState.query.get(search_url + "?f=b").content_hash)
+
+    def test_claim_scheduled_sync(self):
+        self.assertTrue(catalog.claim_scheduled_sync(3600))
+        self.assertFalse(catalog.claim_scheduled_sync(3600))
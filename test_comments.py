@@ -0,0 +1,69 @@
+"""Comment thread pagination tests."""
+
+import os
+from unittest import TestCase
+
+from models import db, User, Exercise, ExerciseCategory, ExerciseComment
+
+# Set an environmental variable to use a different database for tests
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+from comments import get_comment_page
+
+db.create_all()
+
+class CommentPageTestCase(TestCase):
+    """Test keyset pagination of comment threads."""
+
+    def setUp(self):
+        """Add a user, an exercise with five comments and another exercise with one."""
+
+        db.drop_all()
+        db.create_all()
+
+        user = User.register("testing1", "password", "testing1@test.com", "John", "Doe", None)
+        user.id = 1111
+
+        db.session.add(ExerciseCategory(id=1, name="Arms"))
+        db.session.add(Exercise(id=1, name="Curl", category_id=1))
+        db.session.add(Exercise(id=2, name="Dip", category_id=1))
+
+        for i in range(1, 6):
+            db.session.add(ExerciseComment(id=i, content=f"Comment {i}", user_id=1111, exercise_id=1))
+
+        db.session.add(ExerciseComment(id=6, content="Other", user_id=1111, exercise_id=2))
+
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+
+        db.session.rollback()
+
+    def test_pages_newest_first(self):
+        """Are comments paged newest first until the thread runs out?"""
+
+        comments, next_before = get_comment_page(ExerciseComment, 2, exercise_id=1)
+
+        self.assertEqual([c.id for c in comments], [5, 4])
+        self.assertEqual(next_before, 4)
+
+        comments, next_before = get_comment_page(ExerciseComment, 2, next_before, exercise_id=1)
+
+        self.assertEqual([c.id for c in comments], [3, 2])
+        self.assertEqual(next_before, 2)
+
+        comments, next_before = get_comment_page(ExerciseComment, 2, next_before, exercise_id=1)
+
+        self.assertEqual([c.id for c in comments], [1])
+        self.assertIsNone(next_before)
+
+    def test_authors_loaded(self):
+        """Are comment authors loaded with the page?"""
+
+        comments, next_before = get_comment_page(ExerciseComment, 10, exercise_id=1)
+
+        self.assertIn("user", comments[0].__dict__)
+        self.assertEqual(comments[0].user.username, "testing1")
+
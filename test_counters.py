@@ -0,0 +1,114 @@
+"""Comment and favorite counter tests."""
+
+import os
+from unittest import TestCase
+
+from models import db, User, Exercise, ExerciseCategory, ExerciseComment, ExerciseCounter, MealComment, MealCounter, UserExercise, UserMeal
+
+# Set an environmental variable to use a different database for tests
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+import counters
+
+db.create_all()
+
+class CounterTestCase(TestCase):
+    """Test keeping per-item counts up to date."""
+
+    def setUp(self):
+        """Add two users and two exercises."""
+
+        db.drop_all()
+        db.create_all()
+
+        u1 = User.register("testing1", "password", "testing1@test.com", "John", "Doe", None)
+        u1.id = 1111
+        u2 = User.register("testing2", "password", "testing2@test.com", "Jane", "Doe", None)
+        u2.id = 2222
+
+        db.session.add(ExerciseCategory(id=1, name="Arms"))
+        db.session.add(Exercise(id=1, name="Curl", category_id=1))
+        db.session.add(Exercise(id=2, name="Dip", category_id=1))
+
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+
+        db.session.rollback()
+
+    def counts(self, counter, item_id):
+        """Return (comments, favorites) for an item, read fresh from the database."""
+
+        db.session.expire_all()
+
+        counts = counters.get_counts(counter, item_id)
+
+        return counts.comment_count, counts.favorite_count
+
+    def test_bump(self):
+        """Do bumps add up, start from zero and never go below it?"""
+
+        self.assertEqual(self.counts(ExerciseCounter, 1), (0, 0))
+
+        counters.bump(ExerciseCounter, 1, comments=1)
+        counters.bump(ExerciseCounter, 1, comments=1, favorites=1)
+        db.session.commit()
+
+        self.assertEqual(self.counts(ExerciseCounter, 1), (2, 1))
+
+        counters.bump(ExerciseCounter, 1, favorites=-5)
+        counters.bump(MealCounter, 52874, favorites=-1)
+        db.session.commit()
+
+        self.assertEqual(self.counts(ExerciseCounter, 1), (2, 0))
+        self.assertEqual(self.counts(MealCounter, 52874), (0, 0))
+
+    def test_release_user(self):
+        """Are a user's comments and favorites taken off the counters?"""
+
+        for user_id in (1111, 2222):
+            db.session.add(ExerciseComment(content="Nice", user_id=user_id, exercise_id=1))
+            db.session.add(MealComment(content="Tasty", user_id=user_id, meal_id=5, meal_name="Pie", meal_category=1))
+            db.session.add(UserExercise(user_id=user_id, exercise_id=1))
+
+        db.session.add(ExerciseComment(content="Again", user_id=1111, exercise_id=1))
+        db.session.add(UserMeal(user_id=1111, meal_id=5, meal_name="Pie", meal_category=1))
+
+        db.session.commit()
+
+        counters.reconcile(ExerciseCounter)
+        counters.reconcile(MealCounter)
+        db.session.commit()
+
+        self.assertEqual(self.counts(ExerciseCounter, 1), (3, 2))
+        self.assertEqual(self.counts(MealCounter, 5), (2, 1))
+
+        counters.release_user(1111)
+        db.session.commit()
+
+        self.assertEqual(self.counts(ExerciseCounter, 1), (1, 1))
+        self.assertEqual(self.counts(MealCounter, 5), (1, 0))
+
+    def test_reconcile(self):
+        """Does reconciling fix drifted counts, including items with nothing left?"""
+
+        db.session.add(ExerciseComment(content="Nice", user_id=1111, exercise_id=1))
+        db.session.add(UserExercise(user_id=1111, exercise_id=1))
+        db.session.add(UserExercise(user_id=2222, exercise_id=1))
+
+        db.session.commit()
+
+        counters.bump(ExerciseCounter, 1, comments=7)
+        counters.bump(ExerciseCounter, 2, favorites=3)
+        db.session.commit()
+
+        self.assertEqual(counters.reconcile(ExerciseCounter), 2)
+        db.session.commit()
+
+        self.assertEqual(self.counts(ExerciseCounter, 1), (1, 2))
+        self.assertEqual(self.counts(ExerciseCounter, 2), (0, 0))
+
+        # Nothing left to fix.
+        self.assertEqual(counters.reconcile(ExerciseCounter), 0)
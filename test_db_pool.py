@@ -0,0 +1,129 @@
+"""Database connection pool tests."""
+
+import os
+from unittest import TestCase
+
+from sqlalchemy import create_engine, exc
+
+from models import db
+
+# Set an environmental variable to use a different database for tests
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+import db_pool
+
+SETTINGS = dict(DB_POOL_SIZE=1, DB_MAX_OVERFLOW=1, DB_POOL_TIMEOUT=1, DB_POOL_RECYCLE=0, DB_POOL_PRE_PING=True, DB_STATEMENT_TIMEOUT=0, DB_PGBOUNCER=False)
+
+class EngineOptionsTestCase(TestCase):
+    """Test turning the DB_* settings into engine options."""
+
+    def test_pool_options(self):
+        """Are the pool settings passed on?"""
+
+        options = db_pool.engine_options(dict(SETTINGS, DB_STATEMENT_TIMEOUT=500))
+
+        self.assertIs(options['poolclass'], db_pool.TimedQueuePool)
+        self.assertEqual(options['pool_size'], 1)
+        self.assertEqual(options['max_overflow'], 1)
+        self.assertEqual(options['pool_recycle'], -1)
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertEqual(options['connect_args'], {"options": "-c statement_timeout=500"})
+
+    def test_pgbouncer(self):
+        """Does PgBouncer mode leave the pooling to PgBouncer?"""
+
+        options = db_pool.engine_options(dict(SETTINGS, DB_PGBOUNCER=True, DB_STATEMENT_TIMEOUT=500))
+
+        self.assertEqual(options, {"poolclass": db_pool.TimedNullPool})
+
+    def test_invalid_settings(self):
+        """Are bad settings rejected?"""
+
+        for key, value in (('DB_POOL_SIZE', 0), ('DB_MAX_OVERFLOW', -1), ('DB_POOL_TIMEOUT', "soon"), ('DB_STATEMENT_TIMEOUT', None)):
+            with self.assertRaises(ValueError):
+                db_pool.engine_options(dict(SETTINGS, **{key: value}))
+
+class PoolTestCase(TestCase):
+    """Test pool stats and statement timeouts against the test database."""
+
+    def make_engine(self, **settings):
+        return create_engine(app.config['SQLALCHEMY_DATABASE_URI'], **db_pool.engine_options(dict(SETTINGS, **settings)))
+
+    def test_checkout_stats(self):
+        """Are connections in use, checkouts and timeouts counted?"""
+
+        engine = self.make_engine()
+
+        first = engine.connect()
+        second = engine.connect()
+
+        stats = db_pool.stats(engine)
+
+        self.assertEqual(stats['in_use'], 2)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['overflow'], 1)
+
+        # Pool and overflow are both used up, so this waits DB_POOL_TIMEOUT and gives up.
+        with self.assertRaises(exc.TimeoutError):
+            engine.connect()
+
+        first.close()
+        second.close()
+
+        stats = db_pool.stats(engine)
+
+        self.assertEqual(stats['in_use'], 0)
+        self.assertEqual(stats['peak_in_use'], 2)
+        self.assertEqual(stats['timeouts'], 1)
+        self.assertGreaterEqual(stats['wait_max'], 1)
+
+        engine.dispose()
+
+    def test_statement_timeout(self):
+        """Are slow statements cancelled?"""
+
+        engine = self.make_engine(DB_STATEMENT_TIMEOUT=50)
+
+        with self.assertRaises(exc.OperationalError):
+            engine.execute("SELECT pg_sleep(1)")
+
+        engine.dispose()
+
+    def test_pgbouncer_statement_timeout(self):
+        """Does PgBouncer mode set the statement timeout on each transaction?"""
+
+        db.session.remove()
+
+        app.config.update(DB_PGBOUNCER=True, DB_STATEMENT_TIMEOUT=50)
+
+        try:
+            with app.test_request_context():
+                self.assertEqual(db.session.execute("SHOW statement_timeout").scalar(), "50ms")
+        finally:
+            app.config.update(DB_PGBOUNCER=False, DB_STATEMENT_TIMEOUT=30000)
+            db.session.remove()
+
+    def test_no_statement_timeout_outside_requests(self):
+        """Do background jobs and CLI commands run without the statement timeout?"""
+
+        db.session.remove()
+
+        try:
+            with app.test_request_context():
+                self.assertEqual(db.session.execute("SHOW statement_timeout").scalar(), "30s")
+
+            db.session.remove()
+
+            with app.app_context():
+                self.assertEqual(db.session.execute("SHOW statement_timeout").scalar(), "0")
+        finally:
+            db.session.remove()
+
+    def test_status_shows_pool(self):
+        """Does /status/upstreams report pool usage?"""
+
+        with app.test_client() as client:
+            resp = client.get('/status/upstreams')
+
+            self.assertIn("in_use", resp.json['database']['primary'])
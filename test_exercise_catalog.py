@@ -0,0 +1,102 @@
+"""Exercise catalog cache tests."""
+
+import os
+from unittest import TestCase
+
+from sqlalchemy import event
+
+from models import db, Exercise, ExerciseCategory
+
+# Set an environmental variable to use a different database for tests
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+from catalog import touch_exercise_catalog
+from exercise_catalog import ExerciseCatalog
+
+db.create_all()
+
+class ExerciseCatalogTestCase(TestCase):
+    """Test the in-memory exercise category listings."""
+
+    def setUp(self):
+        """Add two categories, one with exercises."""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add(ExerciseCategory(id=1, name="Arms"))
+        db.session.add(ExerciseCategory(id=2, name="Legs"))
+        db.session.add(Exercise(id=1, name="Curl", category_id=1))
+        db.session.add(Exercise(id=2, name="Dip", category_id=1))
+
+        db.session.commit()
+
+        self.catalog = ExerciseCatalog(check_interval=30)
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+
+        db.session.rollback()
+
+    def count_statements(self, fn):
+        """Return how many SQL statements `fn()` runs."""
+
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        event.listen(db.engine, "before_cursor_execute", count)
+
+        try:
+            fn()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+
+        return len(statements)
+
+    def test_listings(self):
+        """Are categories and their exercises listed?"""
+
+        self.assertEqual(self.catalog.categories(), [{"id": 1, "name": "Arms"}, {"id": 2, "name": "Legs"}])
+
+        listing = self.catalog.category(1)
+
+        self.assertEqual(listing["category"]["name"], "Arms")
+        self.assertEqual([exercise["name"] for exercise in listing["exercises"]], ["Curl", "Dip"])
+        self.assertEqual(self.catalog.category(2)["exercises"], [])
+        self.assertIsNone(self.catalog.category(3))
+
+    def test_no_queries_once_built(self):
+        """Are reads served without SQL once the catalog is built?"""
+
+        self.catalog.categories()
+
+        self.assertEqual(self.count_statements(lambda: (self.catalog.categories(), self.catalog.category(1))), 0)
+
+    def test_rebuilds_after_sync_writes(self):
+        """Is a sync's write picked up at the next version check, and only then?"""
+
+        self.catalog.categories()
+
+        db.session.add(Exercise(id=3, name="Squat", category_id=2))
+        touch_exercise_catalog()
+        db.session.commit()
+
+        # Still within the check interval.
+        self.assertEqual(self.catalog.category(2)["exercises"], [])
+
+        self.catalog.checked_at -= 30
+
+        self.assertEqual([exercise["name"] for exercise in self.catalog.category(2)["exercises"]], ["Squat"])
+
+    def test_unchanged_version_keeps_catalog(self):
+        """Does a version check with nothing new skip the rebuild?"""
+
+        self.catalog.categories()
+
+        self.catalog.checked_at -= 30
+
+        # Only the version is read.
+        self.assertEqual(self.count_statements(self.catalog.categories), 1)
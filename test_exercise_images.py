@@ -0,0 +1,121 @@
+"""Exercise image lookup tests."""
+
+import os
+from datetime import datetime, timedelta
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests
+from sqlalchemy import event
+
+from models import db, Exercise, ExerciseCategory, ExerciseImage
+
+# Set an environmental variable to use a different database for tests
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+import exercise_images
+
+db.create_all()
+
+class FakeResponse:
+    """Just enough of requests.Response for the image search."""
+
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+class FakeImageSearch:
+    """Answer image searches from a dict of query => image URL and record the requests made."""
+
+    def __init__(self, images):
+        self.images = images
+        self.requests = []
+
+    def __call__(self, upstream, url, params=None, headers=None):
+        self.requests.append((params["q"], headers["x-rapidapi-key"]))
+
+        image = self.images.get(params["q"])
+
+        if isinstance(image, Exception):
+            raise image
+
+        return FakeResponse({"value": [{"url": image}] if image else []})
+
+class ExerciseImagesTestCase(TestCase):
+    """Test finding and storing exercise images."""
+
+    def setUp(self):
+        """Add three exercises, one with a fresh image and one with a stale image."""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add(ExerciseCategory(id=1, name="Arms"))
+        db.session.add(Exercise(id=1, name="Curl", category_id=1))
+        db.session.add(Exercise(id=2, name="Dip", category_id=1))
+        db.session.add(Exercise(id=3, name="Press", category_id=1))
+
+        db.session.add(ExerciseImage(exercise_id=2, url="dip.png", fetched_at=datetime.utcnow()))
+        db.session.add(ExerciseImage(exercise_id=3, url="old.png", fetched_at=datetime.utcnow() - timedelta(days=60)))
+
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+
+        db.session.rollback()
+
+    def test_needing_images(self):
+        """Are exercises without an image or with a stale one picked, in one query?"""
+
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        event.listen(db.engine, "before_cursor_execute", count)
+
+        try:
+            with app.test_request_context():
+                exercises = exercise_images.exercises_needing_images()
+
+                images = [exercise.image and exercise.image.url for exercise in exercises]
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+
+        self.assertEqual([exercise.id for exercise in exercises], [1, 3])
+        self.assertEqual(images, [None, "old.png"])
+        self.assertEqual(len(statements), 1)
+
+    def test_resolve_images(self):
+        """Are found images stored, empty results remembered and failures skipped?"""
+
+        search = FakeImageSearch({"Curl Exercise": "curl.png", "Press Exercise": requests.ConnectionError("down")})
+
+        with app.app_context(), patch("http_client.get", search):
+            self.assertEqual(exercise_images.resolve_images(api_key="key"), 1)
+
+            # The failed search is retried next time; the fresh image isn't looked up again.
+            search.images["Press Exercise"] = None
+
+            self.assertEqual(exercise_images.resolve_images(api_key="key"), 1)
+
+        self.assertEqual(search.requests, [("Curl Exercise", "key"), ("Press Exercise", "key"), ("Press Exercise", "key")])
+        self.assertEqual(ExerciseImage.query.get(1).url, "curl.png")
+        self.assertIsNone(ExerciseImage.query.get(3).url)
+
+    def test_no_api_key(self):
+        """Is nothing looked up when RAPIDAPI_KEY isn't set?"""
+
+        search = FakeImageSearch({})
+
+        with app.app_context(), patch("http_client.get", search), patch.dict(app.config, RAPIDAPI_KEY=None):
+            self.assertIsNone(exercise_images.resolve_images())
+
+        self.assertEqual(search.requests, [])
@@ -87,7 +87,46 @@ class ExerciseModelTestCase(TestCase):
         self.assertEqual(e[1].id, e2.id)
         self.assertEqual(e[1].name, "Triceps Pushdown")
         self.assertEqual(e[1].description, "Triceps exercise")
-        
+
+    def test_exercise_description(self):
+        """Test sanitized descriptions are stored alongside the raw wger description."""
+
+        raw = '<p>Lie on your <b style="color: red">back</b>.</p><ol><li>Lift</li><li>Lower</li></ol><script>alert(1)</script>'
+
+        e1 = Exercise(name="Crunches", category_id=10)
+        e1.id = 500
+        e1.set_description(raw)
+
+        db.session.add(e1)
+
+        db.session.commit()
+
+        e = Exercise.query.get(500)
+
+        self.assertEqual(e.description, raw)
+        self.assertEqual(e.description_html, "<p>Lie on your <b>back</b>.</p><ol><li>Lift</li><li>Lower</li></ol>")
+        self.assertEqual(e.description_text, "Lie on your back.\nLift\nLower")
+
+    def test_exercise_description_nested_in_dropped_tag(self):
+        """Are tags inside a dropped tag removed with it?"""
+
+        e1 = Exercise(name="Crunches", category_id=10)
+        e1.set_description('<object><p>hi</p><span>x</span></object><p>ok</p><iframe><div><b>x</b></div></iframe>after')
+
+        self.assertEqual(e1.description_html, "<p>ok</p>after")
+        self.assertEqual(e1.description_text, "ok\nafter")
+
+    def test_exercise_description_comments(self):
+        """Are comments, CDATA, processing instructions and doctypes dropped?"""
+
+        e1 = Exercise(name="Crunches", category_id=10)
+        e1.set_description('<!-- --!><img src=x onerror=alert(1)> -->')
+
+        self.assertEqual(e1.description_html, "")
+
+        e1.set_description('<!DOCTYPE html><p>ok<!-- <script>x</script> --></p><![CDATA[<img src=x>]]><?php echo 1 ?>after')
+
+        self.assertEqual(e1.description_html, "<p>ok</p>after")
 
     def test_user_exercise_model(self):
         """Test adding exercises to a user's exercises functionality."""
@@ -117,6 +156,37 @@ class ExerciseModelTestCase(TestCase):
         self.assertEqual(exc[0].exercise_id, e1.id)
         self.assertEqual(exc[1].exercise_id, e2.id)
 
+
+    def test_user_exercise_add_remove(self):
+        """Test favorites are per user, and adding or removing twice is harmless."""
+
+        e1 = Exercise(name="Bench Press", description="Chest exercise", category_id=10)
+        e1.id = 500
+
+        u1 = User.register("testing1", "password", "testing@test.com", "John", "Doe", None)
+        u1.id = 777
+        u2 = User.register("testing2", "password", "testing2@test.com", "Jane", "Doe", None)
+        u2.id = 778
+
+        db.session.add(e1)
+
+        db.session.commit()
+
+        # Both users can favorite the same exercise.
+        self.assertTrue(UserExercise.add(777, 500))
+        self.assertTrue(UserExercise.add(778, 500))
+        self.assertFalse(UserExercise.add(777, 500))
+
+        db.session.commit()
+
+        self.assertEqual(UserExercise.query.filter_by(exercise_id=500).count(), 2)
+
+        self.assertTrue(UserExercise.remove(777, 500))
+        self.assertFalse(UserExercise.remove(777, 500))
+
+        db.session.commit()
+
+        self.assertEqual([ue.user_id for ue in UserExercise.query.filter_by(exercise_id=500)], [778])
         
     def test_exercise_comment_model(self):
         """Test user commentting functionality on an exercise."""
@@ -0,0 +1,117 @@
+"""Outbound HTTP layer tests."""
+
+import time
+from concurrent.futures import TimeoutError
+from unittest import TestCase
+
+import http_client
+
+class FanOutTestCase(TestCase):
+    """Test running upstream calls concurrently."""
+
+    def test_calls_run_concurrently(self):
+        start = time.monotonic()
+
+        results = http_client.fan_out({"a": lambda: time.sleep(0.2) or 1, "b": lambda: time.sleep(0.2) or 2}, timeout=1)
+
+        self.assertEqual(results, {"a": 1, "b": 2})
+        self.assertLess(time.monotonic() - start, 0.35)
+
+    def test_failures_and_deadline(self):
+        results = http_client.fan_out({"ok": lambda: "done", "error": lambda: 1 / 0, "slow": lambda: time.sleep(1)}, timeout=0.2)
+
+        self.assertEqual(results["ok"], "done")
+        self.assertIsInstance(results["error"], ZeroDivisionError)
+        self.assertIsInstance(results["slow"], TimeoutError)
+
+class CircuitBreakerTestCase(TestCase):
+    """Test the per-upstream circuit breaker."""
+
+    def test_trips_after_repeated_failures(self):
+        breaker = http_client.CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+        breaker.before_call()
+        breaker.record_failure("timeout")
+        breaker.before_call()
+        breaker.record_failure("timeout")
+
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertRaises(http_client.CircuitOpenError, breaker.before_call)
+        self.assertEqual(breaker.stats()["trips"], 1)
+        self.assertEqual(breaker.stats()["rejected"], 1)
+
+    def test_half_open_trial_call(self):
+        breaker = http_client.CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+
+        breaker.record_failure("HTTP 503")
+        time.sleep(0.06)
+
+        # One trial call is let through after the reset timeout; a failure re-opens the circuit.
+        breaker.before_call()
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
+        breaker.record_failure("HTTP 503")
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertEqual(breaker.trips, 2)
+
+        time.sleep(0.06)
+
+        breaker.before_call()
+        breaker.record_success()
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_trial_call_raising_other_errors(self):
+        breaker = http_client.UPSTREAMS["wger"].breaker
+
+        def broken_get(url, **kwargs):
+            raise ValueError("bad URL")
+
+        session = http_client.get_session("wger")
+        session_get = session.get
+        session.get = broken_get
+
+        try:
+            breaker.record_failure("HTTP 503")
+            breaker.state = breaker.OPEN
+            breaker.opened_at = time.monotonic() - breaker.reset_timeout
+
+            # The trial call fails with something other than a RequestException; it's wrapped, and the circuit re-opens instead of staying half-open.
+            self.assertRaises(http_client.UpstreamError, http_client.get, "wger", "https://wger.de/api/v2/")
+            self.assertEqual(breaker.state, breaker.OPEN)
+        finally:
+            session.get = session_get
+            breaker.record_success()
+
+    def test_rate_limited_counts_as_failure(self):
+        breaker = http_client.UPSTREAMS["wger"].breaker
+
+        class RateLimited:
+            status_code = 429
+
+        session = http_client.get_session("wger")
+        session_get = session.get
+        session.get = lambda url, **kwargs: RateLimited()
+
+        try:
+            failures = breaker.failures
+
+            http_client.get("wger", "https://wger.de/api/v2/")
+
+            self.assertEqual(breaker.failures, failures + 1)
+        finally:
+            session.get = session_get
+            breaker.record_success()
+
+    def test_lost_trial_call(self):
+        breaker = http_client.CircuitBreaker("test", failure_threshold=1, reset_timeout=0.05)
+
+        breaker.record_failure("HTTP 503")
+        time.sleep(0.06)
+
+        # The trial call never reports back; calls are refused until another reset timeout has passed.
+        breaker.before_call()
+        self.assertRaises(http_client.CircuitOpenError, breaker.before_call)
+
+        time.sleep(0.06)
+
+        breaker.before_call()
+        self.assertEqual(breaker.state, breaker.HALF_OPEN)
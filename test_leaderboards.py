@@ -0,0 +1,218 @@
+"""Leaderboard tests."""
+
+import os
+from datetime import date, timedelta
+from unittest import TestCase
+
+from sqlalchemy import event
+
+from models import db, User, UserExercise, ExerciseComment, Exercise, ExerciseCategory, ExerciseActivity, ExerciseCounter, Meal, MealCategory, MealActivity, MealCounter
+
+# Set an environmental variable to use a different database for tests
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+import counters
+import leaderboards
+
+db.create_all()
+
+class LeaderboardTestCase(TestCase):
+    """Test ranking items on recent activity."""
+
+    def setUp(self):
+        """Add three exercises in two categories and a meal."""
+
+        db.drop_all()
+        db.create_all()
+
+        db.session.add(ExerciseCategory(id=1, name="Arms"))
+        db.session.add(ExerciseCategory(id=2, name="Legs"))
+        db.session.add(Exercise(id=1, name="Curl", category_id=1))
+        db.session.add(Exercise(id=2, name="Dip", category_id=1))
+        db.session.add(Exercise(id=3, name="Squat", category_id=2))
+
+        db.session.add(MealCategory(id=1, name="Dessert", description="Sweet", image_url="dessert.png"))
+        db.session.add(Meal(id=5, name="Pie", category_id=1))
+
+        db.session.commit()
+
+    def tearDown(self):
+        """Clean up fouled transactions."""
+
+        db.session.rollback()
+
+    def ranking(self, kind, metric, category_id=leaderboards.ALL_CATEGORIES):
+        """Return [(item id, score), ...] on a board, best first."""
+
+        return [(entry["item_id"], entry["score"]) for entry in leaderboards.leaderboard_cache.get_boards(kind, category_id)[metric]]
+
+    def test_bump_records_activity(self):
+        """Do additions add up in today's activity row, and removals come off the day they were added?"""
+
+        yesterday = date.today() - timedelta(days=1)
+
+        db.session.add(MealActivity(meal_id=5, day=yesterday, favorite_count=2))
+        db.session.commit()
+
+        counters.bump(ExerciseCounter, 1, favorites=1)
+        counters.bump(ExerciseCounter, 1, comments=1, favorites=1)
+        counters.bump(MealCounter, 5, favorites=1)
+        counters.bump(MealCounter, 5, favorites=-1, added_on=yesterday)
+        # Added before activity was recorded, or on a day that's been pruned: nothing to take off.
+        counters.bump(MealCounter, 5, favorites=-1)
+        counters.bump(MealCounter, 5, favorites=-1, added_on=date.today() - timedelta(days=90))
+        db.session.commit()
+
+        row = ExerciseActivity.query.get((1, date.today()))
+
+        self.assertEqual((row.comment_count, row.favorite_count), (1, 2))
+        self.assertEqual(MealActivity.query.get((5, date.today())).favorite_count, 1)
+        self.assertEqual(MealActivity.query.get((5, yesterday)).favorite_count, 1)
+        self.assertEqual(MealActivity.query.count(), 2)
+
+    def test_refresh(self):
+        """Are items ranked overall and per category, best first?"""
+
+        counters.bump(ExerciseCounter, 1, favorites=1)
+        counters.bump(ExerciseCounter, 2, favorites=3, comments=1)
+        counters.bump(ExerciseCounter, 3, favorites=2)
+        counters.bump(MealCounter, 5, comments=4)
+        db.session.commit()
+
+        leaderboards.refresh(30, 2)
+        db.session.commit()
+
+        self.assertEqual(self.ranking("exercises", "favorited"), [(2, 3), (3, 2)])
+        self.assertEqual(self.ranking("exercises", "favorited", 1), [(2, 3), (1, 1)])
+        self.assertEqual(self.ranking("exercises", "favorited", 2), [(3, 2)])
+        self.assertEqual(self.ranking("exercises", "discussed"), [(2, 1)])
+        self.assertEqual(self.ranking("meals", "discussed"), [(5, 4)])
+        self.assertEqual(self.ranking("meals", "favorited"), [])
+
+    def test_released_user_leaves_boards(self):
+        """Are a deleted user's favorites and comments taken off the boards?"""
+
+        user = User.register("testing1", "password", "testing1@test.com", "John", "Doe", None)
+        user.id = 1111
+
+        db.session.add(UserExercise(user_id=1111, exercise_id=1))
+        db.session.add(ExerciseComment(content="Nice", user_id=1111, exercise_id=2))
+        counters.bump(ExerciseCounter, 1, favorites=1)
+        counters.bump(ExerciseCounter, 2, comments=1)
+        counters.bump(ExerciseCounter, 3, favorites=1)
+        db.session.commit()
+
+        counters.release_user(1111)
+        User.remove(1111)
+        db.session.commit()
+
+        leaderboards.refresh(30, 5)
+        db.session.commit()
+
+        self.assertEqual(self.ranking("exercises", "favorited"), [(3, 1)])
+        self.assertEqual(self.ranking("exercises", "discussed"), [])
+
+    def test_released_user_old_activity(self):
+        """Does deleting a user whose activity is older than the window leave recent activity alone?"""
+
+        for user_id in (1111, 2222, 3333):
+            user = User.register(f"testing{user_id}", "password", f"testing{user_id}@test.com", "John", "Doe", None)
+            user.id = user_id
+
+        # 1111 favorited and commented on exercise 3 long ago, before the window.
+        db.session.add(UserExercise(user_id=1111, exercise_id=3, added_on=date.today() - timedelta(days=60)))
+        db.session.add(ExerciseComment(content="Old", user_id=1111, exercise_id=3, added_on=date.today() - timedelta(days=45)))
+
+        # Recently, two others favorited exercise 3 and one favorited exercise 2.
+        for user_id, exercise_id in ((2222, 3), (3333, 3), (2222, 2)):
+            db.session.add(UserExercise(user_id=user_id, exercise_id=exercise_id))
+            counters.bump(ExerciseCounter, exercise_id, favorites=1)
+
+        counters.bump(ExerciseCounter, 3, comments=1)
+        db.session.commit()
+
+        counters.release_user(1111)
+        User.remove(1111)
+        db.session.commit()
+
+        leaderboards.refresh(30, 1)
+        db.session.commit()
+
+        self.assertEqual(self.ranking("exercises", "favorited"), [(3, 2)])
+        self.assertEqual(self.ranking("exercises", "discussed"), [(3, 1)])
+
+    def test_unfavorite_old_favorite(self):
+        """Does unfavoriting something favorited before the window leave today's activity alone?"""
+
+        user = User.register("testing1", "password", "testing1@test.com", "John", "Doe", None)
+        user.id = 1111
+
+        db.session.add(UserExercise(user_id=1111, exercise_id=1, added_on=date.today() - timedelta(days=60)))
+        counters.bump(ExerciseCounter, 1, favorites=2)
+        db.session.commit()
+
+        removed = UserExercise.remove(1111, 1)
+        counters.bump(ExerciseCounter, 1, favorites=-1, added_on=removed.added_on)
+        db.session.commit()
+
+        self.assertEqual(ExerciseActivity.query.get((1, date.today())).favorite_count, 2)
+
+    def test_window(self):
+        """Is activity older than the window left out and pruned?"""
+
+        counters.bump(ExerciseCounter, 1, favorites=1)
+
+        db.session.add(ExerciseActivity(exercise_id=2, day=date.today() - timedelta(days=3), favorite_count=5))
+        db.session.add(ExerciseActivity(exercise_id=3, day=date.today() - timedelta(days=10), favorite_count=9))
+
+        db.session.commit()
+
+        leaderboards.refresh(7, 5)
+        db.session.commit()
+
+        self.assertEqual(self.ranking("exercises", "favorited"), [(2, 5), (1, 1)])
+        self.assertIsNone(ExerciseActivity.query.filter_by(exercise_id=3).first())
+
+    def test_boards_kept_in_memory(self):
+        """Are boards read without SQL once loaded, and reloaded after another process refreshes them?"""
+
+        cache = leaderboards.LeaderboardCache(check_interval=30)
+
+        counters.bump(ExerciseCounter, 1, favorites=1)
+        leaderboards.refresh(30, 5)
+        db.session.commit()
+
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        event.listen(db.engine, "before_cursor_execute", count)
+
+        try:
+            with app.test_request_context():
+                cache.get_boards("exercises")
+
+                loaded = len(statements)
+
+                cache.get_boards("exercises", 1)
+                cache.get_boards("meals")
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+
+        # One query for the version and one for every board's entries.
+        self.assertEqual(loaded, 2)
+        self.assertEqual(len(statements), 2)
+
+        # Another process's refresh only bumps the version this cache reads.
+        counters.bump(ExerciseCounter, 2, favorites=2)
+        leaderboards.refresh(30, 5)
+        db.session.commit()
+
+        self.assertEqual([entry["item_id"] for entry in cache.get_boards("exercises")["favorited"]], [1])
+
+        cache.checked_at -= 30
+
+        self.assertEqual([entry["item_id"] for entry in cache.get_boards("exercises")["favorited"]], [2, 1])
+        self.assertEqual(cache.get_boards("exercises", 2), {"favorited": [], "discussed": []})
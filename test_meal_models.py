@@ -4,7 +4,7 @@ import os
 from unittest import TestCase
 from sqlalchemy import exc
 
-from models import db, User, MealCategory, UserMeal, MealComment
+from models import db, User, Meal, MealCategory, UserMeal, MealComment
 
 # Set an environmental variable to use a different database for tests 
 os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
@@ -65,6 +65,39 @@ class MealModelTestCase(TestCase):
         self.assertEqual(mc[3].id, c4.id)
         self.assertEqual(mc[3].name, "Goat")
 
+    def test_meal_model(self):
+        """Test storing a TheMealDB record as a local meal."""
+
+        data = {
+            "idMeal": "52874",
+            "strMeal": "Beef and Mustard Pie",
+            "strArea": "British",
+            "strInstructions": "Preheat the oven.",
+            "strMealThumb": "img",
+            "strYoutube": "https://www.youtube.com/watch?v=nMyBC9staMU",
+            "strIngredient1": "Beef",
+            "strMeasure1": "1kg",
+            "strIngredient2": "Plain Flour",
+            "strMeasure2": "2 tbs",
+            "strIngredient3": "",
+            "strMeasure3": " ",
+        }
+
+        m = Meal()
+        m.update_from_api(data, 10)
+
+        db.session.add(m)
+        db.session.commit()
+
+        m = Meal.query.get(52874)
+
+        self.assertEqual(m.name, "Beef and Mustard Pie")
+        self.assertEqual(m.category.name, "Beef")
+        self.assertEqual(m.youtube_embed_url, "https://www.youtube.com/embed/nMyBC9staMU")
+        self.assertEqual(len(m.ingredients), 2)
+        self.assertEqual(m.ingredients[0].ingredient, "Beef")
+        self.assertEqual(m.ingredients[1].measure, "2 tbs")
+
     def test_user_meal_model(self):
         """Test adding meals to a user's meals functionality."""
 
@@ -102,6 +135,39 @@ class MealModelTestCase(TestCase):
         self.assertEqual(m[1].meal_name, m2_name)
         self.assertEqual(m[1].meal_category, 11)
 
+
+    def test_user_meal_add_remove(self):
+        """Test favorites are per user, and adding or removing twice is harmless."""
+
+        m = Meal(id=555, name="Beef Meal", category_id=10)
+
+        u1 = User.register("testing1", "password", "testing@test.com", "John", "Doe", None)
+        u1.id = 777
+        u2 = User.register("testing2", "password", "testing2@test.com", "Jane", "Doe", None)
+        u2.id = 778
+
+        db.session.add(m)
+
+        db.session.commit()
+
+        # Both users can favorite the same meal.
+        self.assertTrue(UserMeal.add(777, m))
+        self.assertTrue(UserMeal.add(778, m))
+        self.assertFalse(UserMeal.add(777, m))
+
+        db.session.commit()
+
+        self.assertEqual(UserMeal.query.filter_by(meal_id=555).count(), 2)
+
+        self.assertTrue(UserMeal.remove(777, 555))
+        self.assertFalse(UserMeal.remove(777, 555))
+
+        db.session.commit()
+
+        favorites = UserMeal.query.filter_by(meal_id=555).all()
+
+        self.assertEqual([um.user_id for um in favorites], [778])
+        self.assertEqual(favorites[0].meal_name, "Beef Meal")
         
     def test_meal_comment_model(self):
         """Test user commentting functionality on a meal."""
@@ -0,0 +1,85 @@
+"""Homepage news feed tests."""
+
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+import requests
+
+from news import NewsFeed
+
+QUERIES = {"health": "health", "exercise": "exercise"}
+
+def guardian(results):
+    """Return a fake http_client.get_json answering each query from `results` (a result list or an exception)."""
+
+    def get_json(upstream, url, params=None):
+        answer = results[params["q"]]
+
+        if isinstance(answer, Exception):
+            raise answer
+
+        return {"response": {"results": answer}}
+
+    return get_json
+
+class NewsFeedTestCase(TestCase):
+    """Test refreshing the news feed and falling back to cached results."""
+
+    def test_refresh(self):
+        """Are new results swapped in and the refresh time recorded?"""
+
+        feed = NewsFeed(queries=QUERIES)
+
+        with patch("http_client.get_json", guardian({"health": [{"webTitle": "Eat"}], "exercise": [{"webTitle": "Run"}]})):
+            feed.refresh()
+
+        self.assertEqual(feed.results["health"], [{"webTitle": "Eat"}])
+        self.assertEqual(feed.results["exercise"], [{"webTitle": "Run"}])
+        self.assertIsNotNone(feed.last_refresh)
+        self.assertIsNone(feed.last_error)
+
+    def test_failed_refresh_keeps_old_results(self):
+        """Does a failing query keep its old results without counting as a refresh?"""
+
+        feed = NewsFeed(queries=QUERIES)
+
+        with patch("http_client.get_json", guardian({"health": [{"webTitle": "Eat"}], "exercise": [{"webTitle": "Run"}]})):
+            feed.refresh()
+
+        last_refresh = feed.last_refresh
+
+        with patch("http_client.get_json", guardian({"health": [{"webTitle": "Sleep"}], "exercise": requests.ConnectionError("down")})):
+            feed.refresh()
+
+        self.assertEqual(feed.results["health"], [{"webTitle": "Sleep"}])
+        self.assertEqual(feed.results["exercise"], [{"webTitle": "Run"}])
+        self.assertEqual(feed.last_refresh, last_refresh)
+        self.assertIn("down", feed.last_error)
+
+    def test_first_get_waits_for_first_refresh(self):
+        """Does the first reader get the first refresh's results instead of an empty feed?"""
+
+        feed = NewsFeed(queries=QUERIES, first_wait=2)
+
+        def slow_search(query):
+            time.sleep(0.1)
+            return [{"webTitle": query}]
+
+        with patch.object(feed, "search", slow_search):
+            self.assertEqual(feed.get("health"), [{"webTitle": "health"}])
+
+    def test_first_get_gives_up_waiting(self):
+        """Does a reader wait at most `first_wait` seconds when the Guardian is slow?"""
+
+        feed = NewsFeed(queries=QUERIES, first_wait=0.1)
+
+        def slow_search(query):
+            time.sleep(0.5)
+            return [{"webTitle": query}]
+
+        with patch.object(feed, "search", slow_search):
+            start = time.monotonic()
+
+            self.assertEqual(feed.get("health"), [])
+            self.assertLess(time.monotonic() - start, 0.4)
@@ -0,0 +1,98 @@
+"""Read replica routing tests.
+
+Uses a second database, capstone-replica-test, standing in for a replica. Nothing
+replicates into it, so which database a read went to shows in the data it returns.
+"""
+
+import os
+import time
+from unittest import TestCase
+
+from flask import session
+
+from models import db, User
+
+# Set an environmental variable to use a different database for tests
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+
+REPLICA_URI = "postgresql:///capstone-replica-test"
+
+db.create_all()
+
+class ReplicaRoutingTestCase(TestCase):
+    """Test which database the session reads from."""
+
+    def setUp(self):
+        """Add a user with the same id but a different name to the primary and the replica."""
+
+        # Start from a fresh session, as every request does.
+        db.session.remove()
+
+        self.binds = app.config['SQLALCHEMY_BINDS']
+        app.config['SQLALCHEMY_BINDS'] = {'replica-0': REPLICA_URI}
+
+        replica = db.get_engine(app, bind='replica-0')
+
+        for engine in (db.engine, replica):
+            db.Model.metadata.drop_all(engine)
+            db.Model.metadata.create_all(engine)
+
+        db.engine.execute(User.__table__.insert(), id=1, username="on-primary", password="x", email="p@test.com", first_name="John", last_name="Doe")
+        replica.execute(User.__table__.insert(), id=1, username="on-replica", password="x", email="r@test.com", first_name="John", last_name="Doe")
+
+    def tearDown(self):
+        """Remove the replica and clean up fouled transactions."""
+
+        db.session.remove()
+        app.config['SQLALCHEMY_BINDS'] = self.binds
+
+    def username(self):
+        """Return the name of user 1 as this request's session sees it."""
+
+        return User.query.get(1).username
+
+    def test_get_reads_replica(self):
+        """Do GET requests read from the replica?"""
+
+        with app.test_request_context(method="GET"):
+            self.assertEqual(self.username(), "on-replica")
+
+    def test_post_reads_primary(self):
+        """Do write requests read from the primary?"""
+
+        with app.test_request_context(method="POST"):
+            self.assertEqual(self.username(), "on-primary")
+
+    def test_outside_request_reads_primary(self):
+        """Do background jobs and commands read from the primary?"""
+
+        with app.app_context():
+            self.assertEqual(self.username(), "on-primary")
+
+    def test_reads_after_write_use_primary(self):
+        """Does a GET that writes read its own writes from the primary?"""
+
+        with app.test_request_context(method="GET"):
+            db.session.add(User(id=2, username="new", password="x", email="n@test.com", first_name="Jane", last_name="Doe"))
+            db.session.flush()
+
+            self.assertEqual(self.username(), "on-primary")
+
+    def test_recent_write_sticks_to_primary(self):
+        """Do GETs shortly after a write request from the same client read from the primary?"""
+
+        with app.test_request_context(method="GET"):
+            session['primary_until'] = time.time() + 10
+
+            self.assertEqual(self.username(), "on-primary")
+
+    def test_write_request_marks_session(self):
+        """Does a write request mark the client's session for primary reads?"""
+
+        with app.test_client() as client:
+            client.post('/login')
+
+            with client.session_transaction() as sess:
+                self.assertGreater(sess['primary_until'], time.time())
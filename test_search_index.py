@@ -0,0 +1,79 @@
+"""Meal search index tests."""
+
+import os
+from unittest import TestCase
+
+from models import db, Meal, MealCategory
+
+# Set an environmental variable to use a different database for tests 
+os.environ['DATABASE_URL'] = "postgresql:///capstone-test"
+
+from app import app
+from search_index import MealSearchIndex, meal_index
+
+db.create_all()
+
+class MealSearchIndexTestCase(TestCase):
+    """Test searching the local meal index."""
+
+    def setUp(self):
+        """Create sample meals and build an index over them."""
+
+        db.drop_all()
+        db.create_all()
+
+        c1 = MealCategory(name="Beef", description="Beef meals", image_url="img1")
+        c1.id = 10
+        c2 = MealCategory(name="Chicken", description="Chicken meals", image_url="img2")
+        c2.id = 11
+
+        db.session.add_all([c1, c2])
+
+        m1 = Meal()
+        m1.update_from_api({"idMeal": "1", "strMeal": "Beef and Mustard Pie", "strArea": "British", "strIngredient1": "Beef", "strMeasure1": "1kg"}, 10)
+        m2 = Meal()
+        m2.update_from_api({"idMeal": "2", "strMeal": "Chicken Curry", "strArea": "Indian", "strIngredient1": "Mustard Seeds", "strMeasure1": "1 tsp"}, 11)
+
+        db.session.add_all([m1, m2])
+
+        db.session.commit()
+
+        self.index = MealSearchIndex()
+
+    def tearDown(self):
+        """Tear down after tests are completed"""
+        res = super().tearDown()
+        db.session.rollback()
+        return res
+
+    def test_ranking(self):
+        """Name matches rank above ingredient matches."""
+
+        results = self.index.search("mustard")
+
+        self.assertEqual([m["name"] for m in results], ["Beef and Mustard Pie", "Chicken Curry"])
+        self.assertEqual(results[1]["category_id"], 11)
+
+    def test_prefix_and_all_terms(self):
+        self.assertEqual([m["name"] for m in self.index.search("chick")], ["Chicken Curry"])
+        self.assertEqual([m["name"] for m in self.index.search("indian curr")], ["Chicken Curry"])
+        self.assertEqual(self.index.search("beef curry"), [])
+        self.assertEqual(self.index.search(""), [])
+
+    def test_random_meal(self):
+        """Is a random meal picked from the index, with its category for the link?"""
+
+        meal = self.index.random_meal()
+
+        self.assertIn((meal["id"], meal["category_id"]), [(1, 10), (2, 11)])
+
+    def test_random_meal_page(self):
+        """Does /meals/random send the user to a local meal page?"""
+
+        meal_index.invalidate()
+
+        with app.test_client() as client:
+            resp = client.get('/meals/random')
+
+            self.assertEqual(resp.status_code, 302)
+            self.assertRegex(resp.location, r"/meals/(10/1|11/2)$")
@@ -2,9 +2,9 @@
 
 import os
 from unittest import TestCase
-from sqlalchemy import exc
+from sqlalchemy import event, exc
 
-from models import db, User
+from models import db, User, ExerciseCategory, Exercise, UserExercise, UserMeal, ExerciseComment, MealComment
 
 # Set an environmental variable to use a different database for tests 
 os.environ['DATABASE_URL'] = "postgresql:///warbler-test"
@@ -179,3 +179,92 @@ class UserModelTestCase(TestCase):
 
         
 
+    ####
+    # Dashboard Tests
+    ####
+
+    def test_get_dashboard_query_count(self):
+        """Does loading the dashboard take the same number of queries however much the user has saved?"""
+
+        user = User.register("testing1", "password", "testing1@test.com", "John", "Doe", None)
+        user.id = 1111
+
+        category = ExerciseCategory(id=1, name="Arms")
+        db.session.add(category)
+
+        for i in range(1, 6):
+            db.session.add(Exercise(id=i, name=f"Exercise {i}", category_id=1))
+            db.session.add(UserExercise(user_id=1111, exercise_id=i))
+            db.session.add(UserMeal(user_id=1111, meal_id=i, meal_name=f"Meal {i}", meal_category=1))
+            db.session.add(ExerciseComment(content="Nice", user_id=1111, exercise_id=i))
+            db.session.add(MealComment(content="Tasty", user_id=1111, meal_id=i, meal_name=f"Meal {i}", meal_category=1))
+
+        db.session.commit()
+        db.session.expire_all()
+
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        event.listen(db.engine, "before_cursor_execute", count)
+
+        # Counted as in a web request, where no statement timeout needs switching off.
+        try:
+            with app.test_request_context():
+                u = User.get_dashboard(1111)
+
+                # Touch everything the dashboard template renders.
+                names = [(ue.exercise.name, ue.exercise.category.id) for ue in u.user_exercises]
+                names += [(c.exercise.name, c.exercise.category_id) for c in u.exercise_comments]
+                names += [(m.meal_name, m.meal_id) for m in u.user_meals]
+                names += [(c.meal_name, c.content) for c in u.meal_comments]
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count)
+
+        self.assertEqual(len(names), 20)
+        self.assertEqual(len(statements), 5)
+
+    def test_get_dashboard_missing_user(self):
+        """Does loading the dashboard of an unknown user return None?"""
+
+        self.assertIsNone(User.get_dashboard(2222))
+
+    def test_remove(self):
+        """Does removing a user take one statement and delete their comments and favorites too?"""
+
+        for user_id, username in ((1111, "testing1"), (2222, "testing2")):
+            user = User.register(username, "password", f"{username}@test.com", "John", "Doe", None)
+            user.id = user_id
+
+        db.session.add(ExerciseCategory(id=1, name="Arms"))
+        db.session.add(Exercise(id=1, name="Curl", category_id=1))
+
+        for user_id in (1111, 2222):
+            db.session.add(UserExercise(user_id=user_id, exercise_id=1))
+            db.session.add(UserMeal(user_id=user_id, meal_id=1, meal_name="Pie", meal_category=1))
+            db.session.add(ExerciseComment(content="Nice", user_id=user_id, exercise_id=1))
+            db.session.add(MealComment(content="Tasty", user_id=user_id, meal_id=1, meal_name="Pie", meal_category=1))
+
+        db.session.commit()
+
+        statements = []
+
+        def count(*args):
+            statements.append(args[2])
+
+        with app.test_request_context(method="POST"):
+            event.listen(db.engine, "before_cursor_execute", count)
+
+            try:
+                self.assertTrue(User.remove(1111))
+            finally:
+                event.remove(db.engine, "before_cursor_execute", count)
+
+            db.session.commit()
+
+        self.assertEqual(len(statements), 1)
+        self.assertFalse(User.remove(1111))
+
+        for model in (UserExercise, UserMeal, ExerciseComment, MealComment):
+            self.assertEqual([row.user_id for row in model.query.all()], [2222])
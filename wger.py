@@ -0,0 +1,60 @@
+"""Client for the wger exercise API (https://wger.de/en/software/api)."""
+
+import logging
+
+import http_client
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://wger.de/api/v2"
+
+# wger's English language id.
+ENGLISH = 2
+
+
+def get_page(url, params=None):
+    """Fetch one page of a wger list endpoint."""
+
+    return http_client.get_json("wger", url, params=params)
+
+
+def iter_pages(url, params=None, progress=None, get_page=get_page):
+    """Yield each page of results from a paginated wger endpoint, following `next` links.
+
+    Only one page is held in memory at a time. `progress`, if given, is called after
+    every page with the number of results seen so far and the total reported by wger.
+    `get_page(url, params)` fetches a page; the catalog sync passes one that skips
+    pages which haven't changed since the last run.
+    """
+
+    seen = 0
+
+    while url:
+        page = get_page(url, params)
+
+        # The `next` link already carries the query string.
+        params = None
+
+        results = page["results"]
+        seen += len(results)
+
+        logger.info("Fetched %s/%s results from %s", seen, page.get("count"), url)
+
+        if progress:
+            progress(seen, page.get("count"))
+
+        yield results
+
+        url = page.get("next")
+
+
+def iter_exercise_pages(page_size=100, progress=None, get_page=get_page):
+    """Yield pages of English exercises from wger."""
+
+    return iter_pages(f"{BASE_URL}/exercise/", params={"language": ENGLISH, "limit": page_size}, progress=progress, get_page=get_page)
+
+
+def get_exercise_categories(get_page=get_page):
+    """Return every exercise category from wger."""
+
+    return [category for page in iter_pages(f"{BASE_URL}/exercisecategory/", get_page=get_page) for category in page]